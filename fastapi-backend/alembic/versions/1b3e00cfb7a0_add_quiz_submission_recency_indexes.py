@@ -0,0 +1,39 @@
+"""add quiz submission recency indexes
+
+Revision ID: 1b3e00cfb7a0
+Revises: 3223a1adbd71
+Create Date: 2026-10-15 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b3e00cfb7a0'
+down_revision: Union[str, Sequence[str], None] = '3223a1adbd71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by create_all after these indexes were added to the model already have them
+    op.create_index(
+        'ix_quiz_submissions_user_month_day_created', 'quiz_submissions',
+        ['user_id', 'month_index', 'day', sa.text('created_at DESC')],
+        unique=False, if_not_exists=True
+    )
+    op.create_index(
+        'ix_quiz_submissions_user_created', 'quiz_submissions',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_quiz_submissions_user_created', table_name='quiz_submissions', if_exists=True)
+    op.drop_index('ix_quiz_submissions_user_month_day_created', table_name='quiz_submissions', if_exists=True)
@@ -3,14 +3,33 @@ Enhanced Memory Management for Agentic EduAI
 Handles multi-layer memory: conversation, episodic, semantic, graph
 """
 
-import json
+import os
+import re
+import time
+import atexit
+import hashlib
+import logging
 import sqlite3
+import threading
+import queue
+from pathlib import Path
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 import numpy as np
+import orjson
 from sentence_transformers import SentenceTransformer
-import networkx as nx
+from app.core.config import settings
+
+try:
+    import hnswlib
+except ImportError:  # ANN search is optional; brute-force scoring is used without it
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class MemoryEntry:
@@ -21,44 +40,288 @@ class MemoryEntry:
     timestamp: datetime
     embedding: Optional[List[float]] = None
 
+def _load_embedding_model() -> SentenceTransformer:
+    """Load the sentence embedding model, preferring the ONNX Runtime backend"""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        model_kwargs = {"file_name": settings.EMBEDDING_ONNX_FILE} if settings.EMBEDDING_ONNX_FILE else None
+        try:
+            return SentenceTransformer('all-MiniLM-L6-v2', backend="onnx", model_kwargs=model_kwargs)
+        except Exception as e:
+            logger.warning("ONNX embedding backend unavailable, falling back to PyTorch: %s", e)
+    
+    import torch
+    torch.set_num_threads(os.cpu_count() or 1)
+    return SentenceTransformer('all-MiniLM-L6-v2')
+
+_PROGRAMMING_CONCEPTS = (
+    'python', 'javascript', 'recursion', 'loops', 'functions', 'variables',
+    'classes', 'objects', 'arrays', 'strings', 'algorithms', 'data structures'
+)
+_CONCEPT_ORDER = {concept: i for i, concept in enumerate(_PROGRAMMING_CONCEPTS)}
+# Concept keywords and "day N" references matched in one pass
+_CONCEPT_RE = re.compile(
+    r'(' + '|'.join(map(re.escape, _PROGRAMMING_CONCEPTS)) + r')|day\s*(\d+)',
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=1024)
+def _concepts_core(text: str) -> Tuple[str, ...]:
+    """Concepts in vocabulary order followed by day references"""
+    # Simple keyword extraction (can be enhanced with NLP), single regex pass
+    found = set()
+    day_concepts = []
+    
+    for match in _CONCEPT_RE.finditer(text):
+        if match.group(1):
+            found.add(match.group(1).lower())
+        else:
+            # Also extract day references
+            day_concepts.append(f"day_{match.group(2)}")
+    
+    return tuple(sorted(found, key=_CONCEPT_ORDER.__getitem__)) + tuple(day_concepts)
+
 class AgentMemoryManager:
     def __init__(self, db_path: str = "agent_memory.db"):
         self.db_path = db_path
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.knowledge_graph = nx.DiGraph()
+        self.embedding_model = _load_embedding_model()
+        self._embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
+        # Adjacency map of (user_id, source) -> {(user_id, target): (relationship, weight)}
+        self._adj: Dict[Tuple[int, str], Dict[Tuple[int, str], Tuple[str, float]]] = defaultdict(dict)
+        self._graph_lock = threading.Lock()
+        # Graph rows waiting to be flushed to SQLite in one executemany
+        self._pending_edges: List[tuple] = []
+        self._pending_since = 0.0
+        self._edge_lock = threading.Lock()
+        self._edge_flush_size = 50
+        self._edge_flush_interval = 5.0
+        # Per-user L2-normalized embedding matrices for semantic search, loaded lazily. Each is a
+        # capacity-doubling buffer whose first _emb_count[user] rows (and row ids) are live;
+        # appends never touch rows a reader already sliced. Guarded by _episodic_lock
+        self._emb_matrix: Dict[int, np.ndarray] = {}
+        self._emb_rowids: Dict[int, np.ndarray] = {}
+        self._emb_count: Dict[int, int] = {}
+        # Bumped on every write or delete of a user's memories, so a load that raced one
+        # (and whose snapshot may lack a row _store_entries skipped appending) isn't installed
+        self._emb_versions: Dict[int, int] = defaultdict(int)
+        self._emb_load_attempts = 3
+        # Per-user HNSW indexes, used once a user has enough memories to outgrow brute force
+        self._ann_index: Dict[int, "hnswlib.Index"] = {}
+        self._ann_dirty: set = set()
+        self._ann_min_rows = 2000
+        self._ann_dir = Path(f"{db_path}.hnsw")
+        # LRU of content hash -> embedding, backed by the embedding_cache table
+        self._encode_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._encode_cache_size = 4096
+        self._encode_lock = threading.Lock()
+        # The embedding_cache table is trimmed to its most recently used rows by the background writer
+        self._embedding_cache_rows = 10000
+        self._embedding_cache_trim_interval = 300.0
+        self._embedding_cache_trimmed_at = 0.0
+        # Recently created playlists per user: lower-cased name -> (playlist id, created at)
+        self._recent_playlists: Dict[int, Dict[str, Tuple[str, float]]] = {}
+        self._recent_playlist_ttl = 600.0
+        # Per-user results of get_last_youtube_link / get_user_playlists, dropped when a new
+        # episodic link or playlist is stored; the version guards against caching a read that
+        # raced with such a write. The lock also guards the embedding buffers and ANN indexes
+        self._episodic_lookups: Dict[Tuple[str, int], Any] = {}
+        self._episodic_versions: Dict[int, int] = defaultdict(int)
+        self._episodic_lock = threading.Lock()
+        # Per-thread buffer of entries deferred by batched_writes()
+        self._batch_state = threading.local()
+        # One shared writer connection (serialized by a lock) plus a pool of read-only connections
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+            PRAGMA mmap_size=268435456;
+        ''')
+        self._write_lock = threading.Lock()
         self._init_db()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(4):
+            self._readers.put(self._open_reader())
+        # Tool results recorded off the request path by a single writer thread
+        self._bg_queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._bg_thread = threading.Thread(target=self._background_writer, name="agent-memory-writer", daemon=True)
+        self._bg_thread.start()
+        atexit.register(self._flush_edges)
+        atexit.register(self._save_ann_indexes)
+        # Registered last so it runs first: queued records land before edges are flushed
+        atexit.register(self.drain_background)
+    
+    @contextmanager
+    def _writer(self):
+        """Yield a cursor on the shared connection inside a single write transaction"""
+        with self._write_lock:
+            cursor = self._conn.cursor()
+            cursor.execute('BEGIN')
+            try:
+                yield cursor
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            else:
+                cursor.execute('COMMIT')
+            finally:
+                cursor.close()
+    
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection to the memory database"""
+        conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True,
+                               check_same_thread=False)
+        conn.executescript('''
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+            PRAGMA mmap_size=268435456;
+        ''')
+        return conn
+    
+    @contextmanager
+    def _reader(self):
+        """Yield a cursor on a pooled read-only connection"""
+        conn = self._readers.get()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            self._readers.put(conn)
     
     def _init_db(self):
         """Initialize SQLite database for memory storage"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._writer() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS memory_entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    content TEXT,
+                    memory_type TEXT,
+                    metadata TEXT,
+                    timestamp INTEGER,
+                    embedding BLOB
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS knowledge_graph (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    source_node TEXT,
+                    target_node TEXT,
+                    relationship TEXT,
+                    weight REAL,
+                    timestamp INTEGER
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    content_hash BLOB PRIMARY KEY,
+                    embedding BLOB,
+                    last_used INTEGER DEFAULT 0
+                )
+            ''')
+            
+            self._migrate_db(cursor)
+            
+            # Recall, search and cleanup all filter on user + type and order by time
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_mem_user_type_ts
+                ON memory_entries(user_id, memory_type, timestamp DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_kg_user_src
+                ON knowledge_graph(user_id, source_node)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_emb_cache_last_used
+                ON embedding_cache(last_used)
+            ''')
+    
+    def _migrate_db(self, cursor: sqlite3.Cursor):
+        """Apply one-time data migrations tracked via PRAGMA user_version"""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS memory_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                content TEXT,
-                memory_type TEXT,
-                metadata TEXT,
-                timestamp TEXT,
-                embedding BLOB
-            )
-        ''')
+        if version < 1:
+            # Re-encode legacy JSON-text embeddings as raw float32 bytes
+            cursor.execute("SELECT id, embedding FROM memory_entries WHERE typeof(embedding) = 'text'")
+            rows = [
+                (np.asarray(orjson.loads(embedding), dtype=np.float32).tobytes(), row_id)
+                for row_id, embedding in cursor.fetchall()
+            ]
+            cursor.executemany('UPDATE memory_entries SET embedding = ? WHERE id = ?', rows)
+            cursor.execute('PRAGMA user_version = 1')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS knowledge_graph (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                source_node TEXT,
-                target_node TEXT,
-                relationship TEXT,
-                weight REAL,
-                timestamp TEXT
+        if version < 2:
+            # Rebuild tables created with ISO-text timestamps as INTEGER epoch microseconds
+            self._conn.create_function(
+                'iso_to_micros', 1,
+                lambda value: self._to_micros(datetime.fromisoformat(value)) if isinstance(value, str) else value,
+                deterministic=True
             )
-        ''')
+            cursor.execute("SELECT type FROM pragma_table_info('memory_entries') WHERE name = 'timestamp'")
+            if cursor.fetchone()[0] == 'TEXT':
+                cursor.execute('DROP INDEX IF EXISTS idx_mem_user_type_ts')
+                cursor.execute('ALTER TABLE memory_entries RENAME TO memory_entries_legacy')
+                cursor.execute('''
+                    CREATE TABLE memory_entries (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        content TEXT,
+                        memory_type TEXT,
+                        metadata TEXT,
+                        timestamp INTEGER,
+                        embedding BLOB
+                    )
+                ''')
+                cursor.execute('''
+                    INSERT INTO memory_entries (id, user_id, content, memory_type, metadata, timestamp, embedding)
+                    SELECT id, user_id, content, memory_type, metadata, iso_to_micros(timestamp), embedding
+                    FROM memory_entries_legacy
+                ''')
+                cursor.execute('DROP TABLE memory_entries_legacy')
+            
+            cursor.execute("SELECT type FROM pragma_table_info('knowledge_graph') WHERE name = 'timestamp'")
+            if cursor.fetchone()[0] == 'TEXT':
+                cursor.execute('DROP INDEX IF EXISTS idx_kg_user_src')
+                cursor.execute('ALTER TABLE knowledge_graph RENAME TO knowledge_graph_legacy')
+                cursor.execute('''
+                    CREATE TABLE knowledge_graph (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        source_node TEXT,
+                        target_node TEXT,
+                        relationship TEXT,
+                        weight REAL,
+                        timestamp INTEGER
+                    )
+                ''')
+                cursor.execute('''
+                    INSERT INTO knowledge_graph (id, user_id, source_node, target_node, relationship, weight, timestamp)
+                    SELECT id, user_id, source_node, target_node, relationship, weight, iso_to_micros(timestamp)
+                    FROM knowledge_graph_legacy
+                ''')
+                cursor.execute('DROP TABLE knowledge_graph_legacy')
+            cursor.execute('PRAGMA user_version = 2')
         
-        conn.commit()
-        conn.close()
+        if version < 3:
+            # Track when each cached embedding was last used so the table can be trimmed
+            cursor.execute("SELECT 1 FROM pragma_table_info('embedding_cache') WHERE name = 'last_used'")
+            if cursor.fetchone() is None:
+                cursor.execute('ALTER TABLE embedding_cache ADD COLUMN last_used INTEGER DEFAULT 0')
+            cursor.execute('PRAGMA user_version = 3')
+    
+    @staticmethod
+    def _to_micros(value: datetime) -> int:
+        """Convert a datetime to the INTEGER epoch-microsecond form stored in SQLite"""
+        return round(value.timestamp() * 1_000_000)
+    
+    @staticmethod
+    def _from_micros(value: int) -> str:
+        """Convert a stored epoch-microsecond timestamp back to ISO format"""
+        return datetime.fromtimestamp(value / 1_000_000).isoformat()
     
     def store_conversation(self, user_id: int, user_message: str, ai_response: str, tools_used: List[str] = None):
         """Store conversation in memory"""
@@ -80,6 +343,16 @@ class AgentMemoryManager:
     
     def store_episodic(self, user_id: int, action: str, result: Dict[str, Any]):
         """Store episodic memory (actions, results, links)"""
+        self.record(user_id, action, result)
+    
+    def record(self, user_id: int, action: str, result: Dict[str, Any],
+               graph_links: List[Tuple[int, str, List[str]]] = None,
+               concept_links: List[Tuple[str, str, str]] = None):
+        """Store an episodic entry plus its graph updates in one write.
+        
+        graph_links are (day, concept, resources) learning path links and
+        concept_links are (source, target, relationship) concept pairs.
+        """
         entry = MemoryEntry(
             user_id=user_id,
             content=f"Action: {action}",
@@ -91,10 +364,90 @@ class AgentMemoryManager:
         self._store_entry(entry)
         
         # Update knowledge graph
+        edges = []
         if "youtube_link" in result:
-            self._add_to_graph(user_id, action, result["youtube_link"], "created_link")
+            edges.append((action, result["youtube_link"], "created_link", 1.0))
         if "playlist_name" in result:
-            self._add_to_graph(user_id, action, result["playlist_name"], "created_playlist")
+            edges.append((action, result["playlist_name"], "created_playlist", 1.0))
+        for day, concept, resources in graph_links or []:
+            edges.extend(self._learning_path_edges(day, concept, resources))
+        for source_concept, target_concept, relationship in concept_links or []:
+            edges.extend(self._bidirectional_edges(source_concept, target_concept, relationship))
+        
+        if edges:
+            self._add_edges_bulk(user_id, edges)
+    
+    def record_background(self, user_id: int, action: str, result: Dict[str, Any],
+                          graph_links: List[Tuple[int, str, List[str]]] = None,
+                          concept_links: List[Tuple[str, str, str]] = None):
+        """Queue record() for the background writer so the caller doesn't wait on encoding or SQLite"""
+        self._bg_queue.put((user_id, action, result, graph_links, concept_links))
+    
+    def _background_writer(self):
+        """Drain queued records, coalescing whatever is waiting into one batched write.
+        
+        While idle it wakes every flush interval so buffered graph edges reach SQLite
+        even when no further edges arrive.
+        """
+        while True:
+            try:
+                items = [self._bg_queue.get(timeout=self._edge_flush_interval)]
+            except queue.Empty:
+                self._background_maintenance()
+                continue
+            while True:
+                try:
+                    items.append(self._bg_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = None in items
+            try:
+                with self.batched_writes():
+                    for item in items:
+                        if item is None:
+                            continue
+                        try:
+                            self.record(*item)
+                        except Exception:
+                            logger.exception("Background memory record failed for user %s", item[0])
+            except Exception:
+                logger.exception("Background memory batch write failed")
+            finally:
+                for _ in items:
+                    self._bg_queue.task_done()
+            
+            if stop:
+                return
+            # A steady stream of records never times out the get() above
+            self._background_maintenance()
+    
+    def _background_maintenance(self):
+        """Flush stale graph edges and keep the embedding cache table bounded"""
+        try:
+            self._flush_stale_edges()
+        except Exception:
+            logger.exception("Background graph edge flush failed")
+        
+        if time.monotonic() - self._embedding_cache_trimmed_at < self._embedding_cache_trim_interval:
+            return
+        self._embedding_cache_trimmed_at = time.monotonic()
+        try:
+            with self._writer() as cursor:
+                cursor.execute('''
+                    DELETE FROM embedding_cache WHERE content_hash IN (
+                        SELECT content_hash FROM embedding_cache
+                        ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self._embedding_cache_rows,))
+        except Exception:
+            logger.exception("Background embedding cache trim failed")
+    
+    def drain_background(self, timeout: float = 10.0):
+        """Stop the background writer after it has written everything queued so far"""
+        if self._bg_thread.is_alive():
+            self._bg_queue.put(None)
+            self._bg_thread.join(timeout)
     
     def store_semantic(self, user_id: int, concept: str, related_concepts: List[str]):
         """Store semantic relationships between concepts"""
@@ -113,73 +466,307 @@ class AgentMemoryManager:
             self._add_to_graph(user_id, concept, related, "related_to")
     
     def _store_entry(self, entry: MemoryEntry):
-        """Store memory entry in database"""
-        # Generate embedding
-        embedding = self.embedding_model.encode(entry.content).tolist()
-        entry.embedding = embedding
+        """Store memory entry in database (deferred while inside batched_writes)"""
+        pending = getattr(self._batch_state, "pending", None)
+        if pending is not None:
+            pending.append(entry)
+            return
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self._store_entries([entry])
+    
+    @contextmanager
+    def batched_writes(self):
+        """Coalesce entries stored within the block into one encode + transaction"""
+        if getattr(self._batch_state, "pending", None) is not None:
+            # Already batching on this thread; the outer block flushes
+            yield
+            return
+        
+        self._batch_state.pending = []
+        try:
+            yield
+        finally:
+            pending, self._batch_state.pending = self._batch_state.pending, None
+            if pending:
+                self._store_entries(pending)
+    
+    def _store_entries(self, entries: List[MemoryEntry]):
+        """Store memory entries in database with a single encode call and commit"""
+        # Generate embeddings
+        embeddings = self._encode_many([entry.content for entry in entries])
         
-        cursor.execute('''
-            INSERT INTO memory_entries (user_id, content, memory_type, metadata, timestamp, embedding)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            entry.user_id,
-            entry.content,
-            entry.memory_type,
-            json.dumps(entry.metadata, default=str),
-            entry.timestamp.isoformat(),
-            json.dumps(embedding)
-        ))
-        
-        conn.commit()
-        conn.close()
+        row_ids = []
+        blobs = []
+        with self._writer() as cursor:
+            for entry, embedding in zip(entries, embeddings):
+                entry.embedding = embedding.tolist()
+                blob = self._quantize(embedding)
+                cursor.execute('''
+                    INSERT INTO memory_entries (user_id, content, memory_type, metadata, timestamp, embedding)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    entry.user_id,
+                    entry.content,
+                    entry.memory_type,
+                    orjson.dumps(entry.metadata, default=str, option=orjson.OPT_NON_STR_KEYS).decode(),
+                    self._to_micros(entry.timestamp),
+                    blob
+                ))
+                row_ids.append(cursor.lastrowid)
+                blobs.append(blob)
+        
+        # Keep the cached matrices in sync so searches don't need a reload
+        for entry, blob, row_id in zip(entries, blobs, row_ids):
+            if entry.memory_type == "episodic" and ("youtube_link" in entry.metadata or "playlist_name" in entry.metadata):
+                with self._episodic_lock:
+                    self._episodic_versions[entry.user_id] += 1
+                    self._episodic_lookups.pop(("youtube_link", entry.user_id), None)
+                    self._episodic_lookups.pop(("playlists", entry.user_id), None)
+            with self._episodic_lock:
+                self._emb_versions[entry.user_id] += 1
+                if entry.user_id in self._emb_matrix:
+                    row = self._normalize_vector(self._dequantize(blob))
+                    self._append_embedding(entry.user_id, row, row_id)
+                    
+                    index = self._ann_index.get(entry.user_id)
+                    if index is not None:
+                        if index.get_current_count() >= index.get_max_elements():
+                            index.resize_index(2 * index.get_max_elements())
+                        index.add_items(row[None, :], [row_id])
+                        self._ann_dirty.add(entry.user_id)
+    
+    def _append_embedding(self, user_id: int, row: np.ndarray, row_id: int):
+        """Append a normalized row to the user's buffers, doubling them when full (caller holds _episodic_lock)"""
+        count = self._emb_count[user_id]
+        matrix = self._emb_matrix[user_id]
+        if count == len(matrix):
+            capacity = max(2 * count, 64)
+            grown = np.empty((capacity, self._embedding_dim), dtype=np.float32)
+            grown[:count] = matrix[:count]
+            rowids = np.empty(capacity, dtype=np.int64)
+            rowids[:count] = self._emb_rowids[user_id][:count]
+            self._emb_matrix[user_id], self._emb_rowids[user_id] = grown, rowids
+            matrix = grown
+        matrix[count] = row
+        self._emb_rowids[user_id][count] = row_id
+        self._emb_count[user_id] = count + 1
+    
+    @staticmethod
+    def _content_key(text: str) -> bytes:
+        """Hash of normalized text used to key cached embeddings"""
+        return hashlib.blake2b(text.strip().lower().encode(), digest_size=16).digest()
+    
+    def encode_query(self, text: str) -> np.ndarray:
+        """L2-normalized embedding of a query, for callers comparing by dot product.
+        
+        One-off queries stay in the in-memory LRU only, so lookups never take the writer lock.
+        """
+        return self._normalize_vector(self._encode_many([text], persist=False)[0])
+    
+    def _encode_many(self, texts: List[str], persist: bool = True) -> List[np.ndarray]:
+        """Encode texts in one model call, skipping content that is already cached.
+        
+        With persist, new encodings are saved to the embedding_cache table and rows
+        reused from it have their last_used time refreshed.
+        """
+        keys = [self._content_key(text) for text in texts]
+        
+        found: Dict[bytes, np.ndarray] = {}
+        with self._encode_lock:
+            for key in keys:
+                embedding = self._encode_cache.get(key)
+                if embedding is not None:
+                    self._encode_cache.move_to_end(key)
+                    found[key] = embedding
+        
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            with self._reader() as cursor:
+                cursor.execute(f'SELECT content_hash, embedding FROM embedding_cache WHERE content_hash IN ({placeholders})',
+                               list(missing))
+                stored = []
+                for key, blob in cursor.fetchall():
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    del missing[key]
+                    stored.append(key)
+            
+            if missing:
+                # Sort by length so each batch pads to similar sequence lengths
+                pending = sorted(missing.items(), key=lambda item: len(item[1]))
+                encoded = self.embedding_model.encode(
+                    [text for _, text in pending], batch_size=32, convert_to_numpy=True
+                ).astype(np.float32, copy=False)
+                for (key, _), embedding in zip(pending, encoded):
+                    found[key] = embedding
+            
+            if persist:
+                now = self._to_micros(datetime.now())
+                rows = [(key, found[key].tobytes(), now) for key in stored + list(missing)]
+                with self._writer() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO embedding_cache (content_hash, embedding, last_used) VALUES (?, ?, ?)
+                        ON CONFLICT(content_hash) DO UPDATE SET last_used = excluded.last_used
+                    ''', rows)
+            
+            with self._encode_lock:
+                for key in set(keys) - self._encode_cache.keys():
+                    # Cached arrays are shared between callers
+                    found[key].flags.writeable = False
+                    self._encode_cache[key] = found[key]
+                while len(self._encode_cache) > self._encode_cache_size:
+                    self._encode_cache.popitem(last=False)
+        
+        return [found[key] for key in keys]
+    
+    def _quantize(self, embedding: np.ndarray) -> bytes:
+        """Serialize a unit-normalized embedding as int8 (or float16) for storage"""
+        unit = self._normalize_vector(embedding)
+        if settings.EMBEDDING_STORAGE_DTYPE == "float16":
+            return unit.astype(np.float16).tobytes()
+        return np.round(unit * 127).astype(np.int8).tobytes()
+    
+    def _dequantize(self, blob: bytes) -> np.ndarray:
+        """Decode a stored embedding, telling int8/float16/float32 rows apart by size"""
+        if len(blob) == self._embedding_dim:
+            return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * np.float32(1 / 127)
+        if len(blob) == 2 * self._embedding_dim:
+            return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return np.frombuffer(blob, dtype=np.float32)
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize each row, leaving all-zero rows untouched"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    @staticmethod
+    def _normalize_vector(vector: np.ndarray) -> np.ndarray:
+        """L2-normalize a single vector; vdot avoids the overhead of np.linalg.norm"""
+        norm = np.sqrt(np.vdot(vector, vector))
+        return (vector / norm).astype(np.float32, copy=False) if norm else vector
+    
+    def _load_embeddings(self, user_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Load a user's embeddings into a contiguous normalized matrix.
+        
+        Returns None once the matrix is installed, or the last snapshot if writes kept
+        racing the load, so the caller can still search it without caching it.
+        """
+        for _ in range(self._emb_load_attempts):
+            with self._episodic_lock:
+                if user_id in self._emb_matrix:
+                    return None
+                version = self._emb_versions[user_id]
+            
+            with self._reader() as cursor:
+                cursor.execute('''
+                    SELECT id, embedding FROM memory_entries
+                    WHERE user_id = ?
+                ''', (user_id,))
+                rows = cursor.fetchall()
+            
+            if rows:
+                matrix = np.vstack([self._dequantize(row[1]) for row in rows])
+                matrix = np.ascontiguousarray(self._normalize_rows(matrix), dtype=np.float32)
+            else:
+                matrix = np.empty((0, self._embedding_dim), dtype=np.float32)
+            rowids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            
+            with self._episodic_lock:
+                # Another thread may have loaded (and appended to) the matrix meanwhile
+                if user_id in self._emb_matrix:
+                    return None
+                # A write since the version was read may be missing from the snapshot
+                if self._emb_versions[user_id] == version:
+                    self._emb_matrix[user_id] = matrix
+                    self._emb_rowids[user_id] = rowids
+                    self._emb_count[user_id] = len(rows)
+                    return None
+        
+        return matrix, rowids
+    
+    def _user_embeddings(self, user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Consistent views of the user's live embedding rows and their row ids"""
+        with self._episodic_lock:
+            loaded = user_id in self._emb_matrix
+        if not loaded:
+            snapshot = self._load_embeddings(user_id)
+            if snapshot is not None:
+                return snapshot
+        
+        with self._episodic_lock:
+            count = self._emb_count.get(user_id, 0)
+            if not count:
+                return np.empty((0, self._embedding_dim), dtype=np.float32), np.empty(0, dtype=np.int64)
+            return self._emb_matrix[user_id][:count], self._emb_rowids[user_id][:count]
     
     def _add_to_graph(self, user_id: int, source: str, target: str, relationship: str, weight: float = 1.0):
         """Add relationship to knowledge graph"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self._add_edges_bulk(user_id, [(source, target, relationship, weight)])
+    
+    def _add_edges_bulk(self, user_id: int, edges: List[Tuple[str, str, str, float]]):
+        """Add (source, target, relationship, weight) edges to the knowledge graph in one batch"""
+        # Update in-memory graph
+        with self._graph_lock:
+            for source, target, relationship, weight in edges:
+                self._adj[(user_id, source)][(user_id, target)] = (relationship, weight)
         
-        cursor.execute('''
-            INSERT INTO knowledge_graph (user_id, source_node, target_node, relationship, weight, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, source, target, relationship, weight, datetime.now().isoformat()))
+        timestamp = self._to_micros(datetime.now())
+        with self._edge_lock:
+            if not self._pending_edges:
+                self._pending_since = time.monotonic()
+            self._pending_edges.extend(
+                (user_id, source, target, relationship, weight, timestamp)
+                for source, target, relationship, weight in edges
+            )
+            flush = (len(self._pending_edges) >= self._edge_flush_size
+                     or time.monotonic() - self._pending_since >= self._edge_flush_interval)
         
-        conn.commit()
-        conn.close()
+        if flush:
+            self._flush_edges()
+    
+    def _flush_stale_edges(self):
+        """Flush buffered edges once the oldest has waited a full flush interval"""
+        with self._edge_lock:
+            stale = bool(self._pending_edges) and time.monotonic() - self._pending_since >= self._edge_flush_interval
+        if stale:
+            self._flush_edges()
+    
+    def _flush_edges(self):
+        """Persist buffered graph edges in a single transaction"""
+        with self._edge_lock:
+            rows, self._pending_edges = self._pending_edges, []
         
-        # Update in-memory graph
-        self.knowledge_graph.add_edge(f"{user_id}:{source}", f"{user_id}:{target}", 
-                                    relationship=relationship, weight=weight)
+        if rows:
+            with self._writer() as cursor:
+                cursor.executemany('''
+                    INSERT INTO knowledge_graph (user_id, source_node, target_node, relationship, weight, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
     
     def recall_conversation(self, user_id: int, limit: int = 10) -> List[Dict]:
         """Recall recent conversations"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT content, metadata, timestamp FROM memory_entries
-            WHERE user_id = ? AND memory_type = 'conversation'
-            ORDER BY timestamp DESC LIMIT ?
-        ''', (user_id, limit))
+        with self._reader() as cursor:
+            cursor.execute('''
+                SELECT content, metadata, timestamp FROM memory_entries
+                WHERE user_id = ? AND memory_type = 'conversation'
+                ORDER BY timestamp DESC LIMIT ?
+            ''', (user_id, limit))
+            rows = cursor.fetchall()
         
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
                 "content": row[0],
-                "metadata": json.loads(row[1]),
-                "timestamp": row[2]
+                "metadata": orjson.loads(row[1]),
+                "timestamp": self._from_micros(row[2])
             })
         
-        conn.close()
         return results
     
-    def recall_episodic(self, user_id: int, action_type: str = None) -> List[Dict]:
+    def recall_episodic(self, user_id: int, action_type: str = None, limit: int = 20) -> List[Dict]:
         """Recall episodic memories (past actions)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         query = '''
             SELECT content, metadata, timestamp FROM memory_entries
             WHERE user_id = ? AND memory_type = 'episodic'
@@ -190,66 +777,121 @@ class AgentMemoryManager:
             query += ' AND content LIKE ?'
             params.append(f'%{action_type}%')
         
-        query += ' ORDER BY timestamp DESC LIMIT 20'
+        query += ' ORDER BY timestamp DESC LIMIT ?'
+        params.append(limit)
         
-        cursor.execute(query, params)
+        with self._reader() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
         
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
                 "content": row[0],
-                "metadata": json.loads(row[1]),
-                "timestamp": row[2]
+                "metadata": orjson.loads(row[1]),
+                "timestamp": self._from_micros(row[2])
             })
         
-        conn.close()
         return results
     
     def semantic_search(self, user_id: int, query: str, limit: int = 5) -> List[Dict]:
         """Perform semantic search across all memories"""
-        query_embedding = self.embedding_model.encode(query)
+        matrix, rowids = self._user_embeddings(user_id)
+        if not len(matrix) or limit <= 0:
+            return []
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Matrix and query are both float32 so scoring runs as a single-precision GEMV
+        query_embedding = self.encode_query(query)
         
-        cursor.execute('''
-            SELECT content, metadata, timestamp, embedding FROM memory_entries
-            WHERE user_id = ?
-        ''', (user_id,))
+        with self._episodic_lock:
+            index = self._get_ann_index(user_id, matrix, rowids)
+            if index is not None:
+                k = min(limit, index.get_current_count())
+                index.set_ef(max(50, k))
+                labels, distances = index.knn_query(query_embedding, k=k)
+        if index is not None:
+            candidates = [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+        else:
+            scores = matrix @ query_embedding
+            
+            # Top-k candidates without sorting the full score vector
+            if limit < len(scores):
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            candidates = [(int(rowids[i]), float(scores[i])) for i in top]
+        
+        hits = [(row_id, similarity) for row_id, similarity in candidates if similarity > 0.5]  # Threshold for relevance
+        if not hits:
+            return []
+        
+        placeholders = ",".join("?" * len(hits))
+        with self._reader() as cursor:
+            cursor.execute(f'''
+                SELECT id, content, metadata, timestamp FROM memory_entries
+                WHERE id IN ({placeholders})
+            ''', [row_id for row_id, _ in hits])
+            rows = {row[0]: row for row in cursor.fetchall()}
         
         results = []
-        for row in cursor.fetchall():
-            stored_embedding = np.array(json.loads(row[3]))
-            similarity = np.dot(query_embedding, stored_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(stored_embedding)
-            )
-            
-            if similarity > 0.5:  # Threshold for relevance
-                results.append({
-                    "content": row[0],
-                    "metadata": json.loads(row[1]),
-                    "timestamp": row[2],
-                    "similarity": float(similarity)
-                })
+        for row_id, similarity in hits:
+            row = rows.get(row_id)
+            if row is None:
+                continue
+            results.append({
+                "content": row[1],
+                "metadata": orjson.loads(row[2]),
+                "timestamp": self._from_micros(row[3]),
+                "similarity": similarity
+            })
         
-        # Sort by similarity
-        results.sort(key=lambda x: x["similarity"], reverse=True)
+        return results
+    
+    def _get_ann_index(self, user_id: int, matrix: np.ndarray, rowids: np.ndarray) -> Optional["hnswlib.Index"]:
+        """Return the user's HNSW index, loading or building it on first use (caller holds _episodic_lock)"""
+        # Only index an installed matrix; _store_entries keeps nothing else up to date
+        if hnswlib is None or len(rowids) < self._ann_min_rows or user_id not in self._emb_matrix:
+            return None
+        
+        index = self._ann_index.get(user_id)
+        if index is not None:
+            return index
+        
+        path = self._ann_dir / f"{user_id}.bin"
+        index = hnswlib.Index(space='cosine', dim=self._embedding_dim)
+        if path.exists():
+            index.load_index(str(path), max_elements=2 * len(rowids))
+            if index.get_current_count() == len(rowids):
+                self._ann_index[user_id] = index
+                return index
+            # Stale on-disk index, rebuild from the matrix
+            index = hnswlib.Index(space='cosine', dim=self._embedding_dim)
         
-        conn.close()
-        return results[:limit]
+        index.init_index(max_elements=2 * len(rowids), ef_construction=200, M=16)
+        index.add_items(matrix, rowids)
+        self._ann_index[user_id] = index
+        self._ann_dirty.add(user_id)
+        return index
+    
+    def _save_ann_indexes(self):
+        """Persist HNSW indexes that changed since they were loaded"""
+        with self._episodic_lock:
+            if not self._ann_dirty:
+                return
+            
+            self._ann_dir.mkdir(parents=True, exist_ok=True)
+            for user_id in list(self._ann_dirty):
+                index = self._ann_index.get(user_id)
+                if index is not None:
+                    index.save_index(str(self._ann_dir / f"{user_id}.bin"))
+            self._ann_dirty.clear()
     
     def get_related_concepts(self, user_id: int, concept: str) -> List[str]:
         """Get related concepts from knowledge graph"""
-        user_concept = f"{user_id}:{concept}"
-        
-        if user_concept in self.knowledge_graph:
-            related = []
-            for neighbor in self.knowledge_graph.neighbors(user_concept):
-                clean_concept = neighbor.split(":", 1)[1] if ":" in neighbor else neighbor
-                related.append(clean_concept)
-            return related
-        
-        return []
+        with self._graph_lock:
+            neighbors = list(self._adj.get((user_id, concept), ()))
+        return [target for _user, target in neighbors]
     
     def get_graph_context(self, user_id: int, query: str) -> Dict[str, Any]:
         """Get GraphRAG context for query"""
@@ -264,95 +906,114 @@ class AgentMemoryManager:
         }
         
         for concept in query_concepts:
-            user_concept = f"{user_id}:{concept}"
-            
-            if user_concept in self.knowledge_graph:
-                # Get all connected nodes
-                neighbors = list(self.knowledge_graph.neighbors(user_concept))
-                
-                for neighbor in neighbors:
-                    edge_data = self.knowledge_graph.get_edge_data(user_concept, neighbor)
-                    relationship = edge_data.get('relationship', 'related')
-                    
-                    clean_neighbor = neighbor.split(":", 1)[1] if ":" in neighbor else neighbor
-                    
-                    if 'note' in relationship or 'day' in clean_neighbor.lower():
-                        graph_context["related_notes"].append(clean_neighbor)
-                    elif 'video' in relationship or 'youtube' in clean_neighbor.lower():
-                        graph_context["related_videos"].append(clean_neighbor)
-                    elif 'depends' in relationship:
-                        if concept not in graph_context["concept_dependencies"]:
-                            graph_context["concept_dependencies"][concept] = []
-                        graph_context["concept_dependencies"][concept].append(clean_neighbor)
+            # Get all connected nodes, from a snapshot since the writer thread may be adding edges
+            with self._graph_lock:
+                neighbors = list(self._adj.get((user_id, concept), {}).items())
+            for (_user, clean_neighbor), (relationship, _weight) in neighbors:
+                if 'note' in relationship or 'day' in clean_neighbor.lower():
+                    graph_context["related_notes"].append(clean_neighbor)
+                elif 'video' in relationship or 'youtube' in clean_neighbor.lower():
+                    graph_context["related_videos"].append(clean_neighbor)
+                elif 'depends' in relationship:
+                    if concept not in graph_context["concept_dependencies"]:
+                        graph_context["concept_dependencies"][concept] = []
+                    graph_context["concept_dependencies"][concept].append(clean_neighbor)
         
         return graph_context
     
     def _extract_concepts(self, text: str) -> List[str]:
         """Extract key concepts from text"""
-        # Simple keyword extraction (can be enhanced with NLP)
-        programming_concepts = [
-            'python', 'javascript', 'recursion', 'loops', 'functions', 'variables',
-            'classes', 'objects', 'arrays', 'strings', 'algorithms', 'data structures'
-        ]
-        
-        text_lower = text.lower()
-        found_concepts = []
-        
-        for concept in programming_concepts:
-            if concept in text_lower:
-                found_concepts.append(concept)
-        
-        # Also extract day references
-        import re
-        day_matches = re.findall(r'day\s*(\d+)', text_lower)
-        for day in day_matches:
-            found_concepts.append(f"day_{day}")
-        
-        return found_concepts
+        return list(_concepts_core(text))
     
     def link_concepts(self, user_id: int, source_concept: str, target_concept: str, relationship: str = "related"):
         """Create bidirectional concept links"""
-        self._add_to_graph(user_id, source_concept, target_concept, relationship)
-        # Add reverse relationship
-        reverse_rel = f"reverse_{relationship}"
-        self._add_to_graph(user_id, target_concept, source_concept, reverse_rel)
+        self._add_edges_bulk(user_id, self._bidirectional_edges(source_concept, target_concept, relationship))
+    
+    @staticmethod
+    def _bidirectional_edges(source_concept: str, target_concept: str, relationship: str) -> List[Tuple[str, str, str, float]]:
+        """Forward edge plus its reverse relationship"""
+        return [
+            (source_concept, target_concept, relationship, 1.0),
+            (target_concept, source_concept, f"reverse_{relationship}", 1.0)
+        ]
     
     def create_learning_path_graph(self, user_id: int, day: int, concept: str, resources: List[str]):
         """Create graph connections for learning day"""
+        self._add_edges_bulk(user_id, self._learning_path_edges(day, concept, resources))
+    
+    def _learning_path_edges(self, day: int, concept: str, resources: List[str]) -> List[Tuple[str, str, str, float]]:
+        """Edges linking a learning day to its concept and the concept to its resources"""
         day_node = f"day_{day}"
         
         # Link day to concept
-        self.link_concepts(user_id, day_node, concept, "teaches")
+        edges = self._bidirectional_edges(day_node, concept, "teaches")
         
         # Link concept to resources
         for resource in resources:
             if 'youtube' in resource or 'video' in resource:
-                self.link_concepts(user_id, concept, resource, "video_resource")
+                edges.extend(self._bidirectional_edges(concept, resource, "video_resource"))
             elif 'notes' in resource or 'drive' in resource:
-                self.link_concepts(user_id, concept, resource, "note_resource")
+                edges.extend(self._bidirectional_edges(concept, resource, "note_resource"))
+        
+        return edges
+    
+    def _cached_episodic_lookup(self, kind: str, user_id: int, load):
+        """Result of load() for this user, reused until a matching episodic entry is stored"""
+        key = (kind, user_id)
+        with self._episodic_lock:
+            if key in self._episodic_lookups:
+                return self._episodic_lookups[key]
+            version = self._episodic_versions[user_id]
+        
+        value = load()
+        with self._episodic_lock:
+            if self._episodic_versions[user_id] == version:
+                self._episodic_lookups[key] = value
+        return value
     
     def get_last_youtube_link(self, user_id: int) -> Optional[str]:
         """Get the last YouTube link from episodic memory"""
-        episodic_memories = self.recall_episodic(user_id, "youtube")
-        
-        for memory in episodic_memories:
-            metadata = memory["metadata"]
-            if "youtube_link" in metadata:
-                return metadata["youtube_link"]
+        def load():
+            with self._reader() as cursor:
+                cursor.execute('''
+                    SELECT json_extract(metadata, '$.youtube_link') FROM memory_entries
+                    WHERE user_id = ? AND memory_type = 'episodic'
+                    AND json_extract(metadata, '$.youtube_link') IS NOT NULL
+                    ORDER BY timestamp DESC LIMIT 1
+                ''', (user_id,))
+                row = cursor.fetchone()
+            return row[0] if row else None
         
-        return None
+        return self._cached_episodic_lookup("youtube_link", user_id, load)
     
     def get_user_playlists(self, user_id: int) -> List[str]:
         """Get all playlists created by user"""
-        episodic_memories = self.recall_episodic(user_id, "playlist")
+        def load():
+            with self._reader() as cursor:
+                cursor.execute('''
+                    SELECT json_extract(metadata, '$.playlist_name') AS name FROM memory_entries
+                    WHERE user_id = ? AND memory_type = 'episodic' AND name IS NOT NULL
+                    GROUP BY name
+                    ORDER BY MAX(timestamp) DESC
+                ''', (user_id,))
+                return [row[0] for row in cursor.fetchall()]
         
-        playlists = []
-        for memory in episodic_memories:
-            metadata = memory["metadata"]
-            if "playlist_name" in metadata:
-                playlists.append(metadata["playlist_name"])
-        
-        return list(set(playlists))  # Remove duplicates
+        return list(self._cached_episodic_lookup("playlists", user_id, load))
+    
+    def remember_playlist(self, user_id: int, name: str, playlist_id: str):
+        """Remember a just-created playlist so follow-up adds skip the playlists lookup"""
+        self._recent_playlists.setdefault(user_id, {})[name.lower().strip()] = (playlist_id, time.monotonic())
+    
+    def recall_playlist(self, user_id: int, name: str) -> Optional[str]:
+        """Id of a playlist created by this user within the TTL, if any"""
+        entry = self._recent_playlists.get(user_id, {}).get(name.lower().strip())
+        if entry is None:
+            return None
+        playlist_id, created = entry
+        if time.monotonic() - created > self._recent_playlist_ttl:
+            self._recent_playlists[user_id].pop(name.lower().strip(), None)
+            return None
+        return playlist_id
     
     def get_contextual_memory(self, user_id: int, query: str) -> Dict[str, Any]:
         """Get comprehensive contextual memory using GraphRAG"""
@@ -361,7 +1022,7 @@ class AgentMemoryManager:
         graph_context = self.get_graph_context(user_id, query)
         
         # Get recent episodic memories
-        recent_actions = self.recall_episodic(user_id)[:5]
+        recent_actions = self.recall_episodic(user_id, limit=5)
         
         return {
             "semantic_matches": semantic_results,
@@ -374,16 +1035,28 @@ class AgentMemoryManager:
         """Clean up memories older than specified days"""
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            DELETE FROM memory_entries
-            WHERE user_id = ? AND timestamp < ? AND memory_type = 'conversation'
-        ''', (user_id, cutoff_date.isoformat()))
+        with self._writer() as cursor:
+            cursor.execute('''
+                SELECT content FROM memory_entries
+                WHERE user_id = ? AND timestamp < ? AND memory_type = 'conversation'
+            ''', (user_id, self._to_micros(cutoff_date)))
+            stale_hashes = [(self._content_key(row[0]),) for row in cursor.fetchall()]
+            cursor.execute('''
+                DELETE FROM memory_entries
+                WHERE user_id = ? AND timestamp < ? AND memory_type = 'conversation'
+            ''', (user_id, self._to_micros(cutoff_date)))
+            # Their cached embeddings would otherwise outlive them
+            cursor.executemany('DELETE FROM embedding_cache WHERE content_hash = ?', stale_hashes)
         
-        conn.commit()
-        conn.close()
+        # Deleted rows invalidate the cached embedding matrix and ANN index
+        with self._episodic_lock:
+            self._emb_versions[user_id] += 1
+            self._emb_matrix.pop(user_id, None)
+            self._emb_rowids.pop(user_id, None)
+            self._emb_count.pop(user_id, None)
+            self._ann_index.pop(user_id, None)
+            self._ann_dirty.discard(user_id)
+        (self._ann_dir / f"{user_id}.bin").unlink(missing_ok=True)
 
 # Global memory manager instance
 memory_manager = AgentMemoryManager()
\ No newline at end of file
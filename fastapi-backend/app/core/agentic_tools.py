@@ -4,66 +4,135 @@ Plug-and-play tools for extensible agent capabilities
 """
 
 import re
-import json
-from typing import Dict, Any, List, Optional
-from langchain.tools import StructuredTool
-from pydantic import BaseModel, Field
-from app.core.google_services import get_day_notes, update_day_notes
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from app.core.google_services import get_day_notes, append_day_notes
 from app.core.youtube_services import (
     search_youtube_videos, create_playlist, add_video_to_playlist, 
     get_video_summary, extract_video_id_from_url, get_user_playlists
 )
-from app.core.learning_path_service import LearningPathService
 from app.core.agent_memory import memory_manager
 from app.models.user import User
 from app.models.learning_plan import LearningPlan
 from sqlalchemy.orm import Session
-from app.database.db import get_db
+from app.database.db import SessionLocal
+from app.core.config import settings
 
-# Tool Input Schemas
-class ToolInput(BaseModel):
-    user_id: int = Field(description="User ID")
-    params: Dict[str, Any] = Field(description="Tool parameters")
-    context: str = Field(description="User context")
+if TYPE_CHECKING:
+    from langchain.tools import StructuredTool
 
-class NotesInput(BaseModel):
-    query: str = Field(description="Notes query or content to add")
-    day: Optional[int] = Field(description="Specific day number")
-    month: Optional[int] = Field(description="Specific month number")
+# Message parsing patterns, compiled once at import. RE2 (google-re2) matches in
+# linear time, so long user messages can't trigger backtracking blowups on the
+# lazy .*? patterns; fall back to the stdlib engine when it isn't installed.
+try:
+    import re2 as _re_engine
+except ImportError:
+    _re_engine = re
 
-class YouTubeInput(BaseModel):
-    query: str = Field(description="Search query or playlist name")
-    video_url: Optional[str] = Field(description="YouTube video URL")
-    playlist_name: Optional[str] = Field(description="Playlist name")
+def _compile_ci(pattern: str):
+    """Compile a case-insensitive pattern (inline flag works on both engines)"""
+    return _re_engine.compile(f"(?i){pattern}")
+
+_DAY_RE = _compile_ci(r'day\s*(\d+)')
+_MONTH_RE = _compile_ci(r'month\s*(\d+)')
+_ADD_NOTE_RE = _compile_ci(r'add\s+(.+?)\s+to\s+(?:day\s*(\d+))?')
+_SEARCH_PATTERNS = [_compile_ci(p) for p in (
+    r'(?:find|search|get|show).*?videos?.*?(?:about|on|for)\s+(.+?)(?:\.|$)',
+    r'(?:find|search|get|show)\s+(.+?)\s+videos?',
+    r'videos?\s+(?:about|on|for)\s+(.+?)(?:\.|$)'
+)]
+_CURRENT_CONCEPT_RE = _re_engine.compile(r'CurrentDayConcept:\s*(.+)')
+_CREATE_PLAYLIST_RE = _compile_ci(r'create.*?playlist.*?(?:called|named)\s*["\'](.+?)["\']')
+_QUOTED_PLAYLIST_RE = _compile_ci(r'playlist\s*["\'](.+?)["\']')
+_PLAYLIST_PATTERNS = [_compile_ci(p) for p in (
+    r'add.*?to.*?playlist\s*["\'](.+?)["\']',
+    r'add.*?to\s+(.+?)\s*playlist',
+    r'add.*?to\s+(.+?)(?:\s|$)'
+)]
+_YT_URL_RE = _re_engine.compile(r'(https?://(?:www\.)?youtube\.com/watch\?v=[\w-]+)')
+
+# Playlist title -> id per user. Built fresh each call on top of get_user_playlists,
+# whose cache skips failed (empty) listings and is dropped when a playlist is created
+def _get_playlist_index(user_id: int) -> Dict[str, str]:
+    index = {}
+    for playlist in get_user_playlists(user_id):
+        index.setdefault(playlist.get('title', '').lower().strip(), playlist.get('id'))
+    return index
+
+# Per-turn lookup cache
+class RequestCache:
+    """User and LearningPlan rows (and computed progress) from one agent turn, keyed by user_id"""
+    
+    def __init__(self):
+        self.users: Dict[int, Optional[User]] = {}
+        self.plans: Dict[int, Optional[LearningPlan]] = {}
+        self.progress: Dict[int, Dict[str, Any]] = {}
+    
+    def get_user(self, db: Session, user_id: int) -> Optional[User]:
+        if user_id not in self.users:
+            self.users[user_id] = db.query(User).filter(User.id == user_id).first()
+        return self.users[user_id]
+    
+    def get_plan(self, db: Session, user_id: int) -> Optional[LearningPlan]:
+        if user_id not in self.plans:
+            self.plans[user_id] = db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
+        return self.plans[user_id]
+
+_request_cache: ContextVar[Optional[RequestCache]] = ContextVar("tool_request_cache", default=None)
+
+@contextmanager
+def tool_request_cache():
+    """Share User/LearningPlan lookups across the tools run inside the block"""
+    if _request_cache.get() is not None:
+        # Nested turn; the outer block owns the cache
+        yield _request_cache.get()
+        return
+    
+    token = _request_cache.set(RequestCache())
+    try:
+        yield _request_cache.get()
+    finally:
+        _request_cache.reset(token)
+
+def _get_user(db: Session, user_id: int) -> Optional[User]:
+    cache = _request_cache.get()
+    if cache is None:
+        return db.query(User).filter(User.id == user_id).first()
+    return cache.get_user(db, user_id)
+
+def _get_plan(db: Session, user_id: int) -> Optional[LearningPlan]:
+    cache = _request_cache.get()
+    if cache is None:
+        return db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
+    return cache.get_plan(db, user_id)
 
 # Core Tool Functions
 def get_notes_tool(query: str, user_id: int = None, day: int = None, month: int = None) -> Dict[str, Any]:
     """Get notes for specific day"""
-    db = next(get_db())
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
+    with SessionLocal() as db:
+        user = _get_user(db, user_id)
         if not user:
             return {"error": "User not found"}
         
         # Extract day/month from query if not provided
         if not day:
-            day_match = re.search(r'day\s*(\d+)', query.lower())
+            day_match = _DAY_RE.search(query)
             day = int(day_match.group(1)) if day_match else user.current_day
         
         if not month:
-            month_match = re.search(r'month\s*(\d+)', query.lower())
+            month_match = _MONTH_RE.search(query)
             month = int(month_match.group(1)) if month_match else user.current_month_index
         
         notes_data = get_day_notes(user_id, month, day)
         
         if notes_data:
             # Store in memory and create graph links
-            memory_manager.store_episodic(user_id, "get_notes", {
+            memory_manager.record_background(user_id, "get_notes", {
                 "day": day, "month": month, "notes_link": notes_data.get("link")
-            })
-            memory_manager.create_learning_path_graph(
-                user_id, day, f"day_{day}_notes", [notes_data.get("link")]
-            )
+            }, graph_links=[(day, f"day_{day}_notes", [notes_data.get("link")])])
             
             return {
                 "success": True,
@@ -73,8 +142,6 @@ def get_notes_tool(query: str, user_id: int = None, day: int = None, month: int
             }
         
         return {"success": False, "message": f"No notes found for Day {day}"}
-    finally:
-        db.close()
 
 def search_youtube_tool(query: str, user_id: int = None) -> Dict[str, Any]:
     """Search YouTube videos"""
@@ -83,23 +150,18 @@ def search_youtube_tool(query: str, user_id: int = None) -> Dict[str, Any]:
     if videos:
         video_links = [v.get('url') for v in videos]
         
-        # Store in memory and create graph links
-        memory_manager.store_episodic(user_id, "search_videos", {
-            "query": query, "video_links": video_links
-        })
-        
-        # Link videos to concepts
+        # Store in memory and link videos to concepts
         concepts = memory_manager._extract_concepts(query)
-        for concept in concepts:
-            memory_manager.create_learning_path_graph(
-                user_id, 0, concept, video_links
-            )
+        memory_manager.record_background(user_id, "search_videos", {
+            "query": query, "video_links": video_links
+        }, graph_links=[(0, concept, video_links) for concept in concepts])
         
+        top3 = videos[:3]
         return {
             "success": True,
-            "videos": videos[:3],
-            "top_video_link": videos[0].get('url'),
-            "markdown_links": [f"[🎥 {v.get('title')}]({v.get('url')})" for v in videos[:3]]
+            "videos": top3,
+            "top_video_link": video_links[0],
+            "markdown_links": [f"[🎥 {v.get('title')}]({url})" for v, url in zip(top3, video_links)]
         }
     
     return {"success": False, "message": f"No videos found for '{query}'"}
@@ -109,12 +171,13 @@ def create_playlist_tool(playlist_name: str, user_id: int = None) -> Dict[str, A
     result = create_playlist(user_id, playlist_name, f"Learning playlist: {playlist_name}")
     
     if result and result.get('id'):
+        memory_manager.remember_playlist(user_id, playlist_name, result.get('id'))
+        
         # Store in memory and create graph links
-        memory_manager.store_episodic(user_id, "create_playlist", {
+        memory_manager.record_background(user_id, "create_playlist", {
             "playlist_name": playlist_name,
             "playlist_url": result.get('url')
-        })
-        memory_manager.link_concepts(user_id, "playlists", playlist_name, "contains")
+        }, concept_links=[("playlists", playlist_name, "contains")])
         
         return {
             "success": True,
@@ -127,14 +190,14 @@ def create_playlist_tool(playlist_name: str, user_id: int = None) -> Dict[str, A
 
 def get_progress_tool(user_id: int = None) -> Dict[str, Any]:
     """Get learning progress"""
-    db = next(get_db())
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        plan = db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
+    with SessionLocal() as db:
+        user = _get_user(db, user_id)
+        plan = _get_plan(db, user_id)
         
         if not user or not plan:
             return {"error": "User or plan not found"}
         
+        from app.core.learning_path_service import LearningPathService
         summary = LearningPathService.get_user_progress_summary(db, user_id, plan.id)
         
         progress_data = {
@@ -145,39 +208,9 @@ def get_progress_tool(user_id: int = None) -> Dict[str, Any]:
         }
         
         # Store in memory
-        memory_manager.store_episodic(user_id, "get_progress", progress_data)
+        memory_manager.record_background(user_id, "get_progress", progress_data)
         
         return {"success": True, "progress": progress_data}
-    finally:
-        db.close()
-
-# LangChain Tool Definitions
-NotesTool = StructuredTool.from_function(
-    func=get_notes_tool,
-    name="NotesTool",
-    description="Get or manage learning notes from Google Drive",
-    args_schema=NotesInput
-)
-
-YouTubeSearchTool = StructuredTool.from_function(
-    func=search_youtube_tool,
-    name="YouTubeSearchTool", 
-    description="Search for educational YouTube videos",
-    args_schema=YouTubeInput
-)
-
-PlaylistTool = StructuredTool.from_function(
-    func=create_playlist_tool,
-    name="PlaylistTool",
-    description="Create YouTube playlists for learning",
-    args_schema=YouTubeInput
-)
-
-ProgressTool = StructuredTool.from_function(
-    func=get_progress_tool,
-    name="ProgressTool",
-    description="Get learning progress and recommendations"
-)
 
 # Future extensible tools (examples)
 def calendar_tool(event_title: str, user_id: int = None) -> Dict[str, Any]:
@@ -190,87 +223,146 @@ def linkedin_tool(post_content: str, user_id: int = None, day: int = None) -> Di
     
     # Use current day if not specified
     if not day:
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
+        with SessionLocal() as db:
+            user = _get_user(db, user_id)
             day = user.current_day if user else 1
-        finally:
-            db.close()
     
     # Generate shareable LinkedIn link
     result = post_to_linkedin_mcp(user_id, day, method="link")
     return result
 
-CalendarTool = StructuredTool.from_function(
-    func=calendar_tool,
-    name="CalendarTool",
-    description="Manage learning schedule in Google Calendar"
-)
-
-LinkedInTool = StructuredTool.from_function(
-    func=linkedin_tool,
-    name="LinkedInTool", 
-    description="Share learning achievements on LinkedIn"
-)
-
-def get_all_tools() -> List[StructuredTool]:
-    """Get all available tools for the agent"""
-    return [
+def _build_tools() -> Tuple["StructuredTool", ...]:
+    """Build the LangChain tool wrappers; langchain and pydantic load on first use"""
+    from langchain.tools import StructuredTool
+    from pydantic import BaseModel, Field
+    
+    # Tool Input Schemas
+    class ToolInput(BaseModel):
+        user_id: int = Field(description="User ID")
+        params: Dict[str, Any] = Field(description="Tool parameters")
+        context: str = Field(description="User context")
+    
+    class NotesInput(BaseModel):
+        query: str = Field(description="Notes query or content to add")
+        day: Optional[int] = Field(description="Specific day number")
+        month: Optional[int] = Field(description="Specific month number")
+    
+    class YouTubeInput(BaseModel):
+        query: str = Field(description="Search query or playlist name")
+        video_url: Optional[str] = Field(description="YouTube video URL")
+        playlist_name: Optional[str] = Field(description="Playlist name")
+    
+    # LangChain Tool Definitions
+    NotesTool = StructuredTool.from_function(
+        func=get_notes_tool,
+        name="NotesTool",
+        description="Get or manage learning notes from Google Drive",
+        args_schema=NotesInput
+    )
+    
+    YouTubeSearchTool = StructuredTool.from_function(
+        func=search_youtube_tool,
+        name="YouTubeSearchTool", 
+        description="Search for educational YouTube videos",
+        args_schema=YouTubeInput
+    )
+    
+    PlaylistTool = StructuredTool.from_function(
+        func=create_playlist_tool,
+        name="PlaylistTool",
+        description="Create YouTube playlists for learning",
+        args_schema=YouTubeInput
+    )
+    
+    ProgressTool = StructuredTool.from_function(
+        func=get_progress_tool,
+        name="ProgressTool",
+        description="Get learning progress and recommendations"
+    )
+    
+    CalendarTool = StructuredTool.from_function(
+        func=calendar_tool,
+        name="CalendarTool",
+        description="Manage learning schedule in Google Calendar"
+    )
+    
+    LinkedInTool = StructuredTool.from_function(
+        func=linkedin_tool,
+        name="LinkedInTool", 
+        description="Share learning achievements on LinkedIn"
+    )
+    
+    return (
         NotesTool,
         YouTubeSearchTool, 
         PlaylistTool,
         ProgressTool,
         CalendarTool,  # Future
         LinkedInTool   # Future
-    ]
+    )
+
+@functools.cache
+def get_all_tools() -> Tuple["StructuredTool", ...]:
+    """Get all available tools for the agent (built once, shared as an immutable tuple)"""
+    return _build_tools()
 
 class AgenticToolsIntegrator:
     """Legacy integrator - kept for backward compatibility"""
     
     @staticmethod
-    async def execute_notes_tool(user_id: int, function: str, params: Dict, context: str, db: Session) -> Dict[str, Any]:
-        """Execute notes-related tools"""
+    async def execute(category: str, user_id: int, function: str, params: Dict, context: str, db: Session) -> Dict[str, Any]:
+        """Execute a tool from any category via the dispatch tables"""
+        handler = _DISPATCH.get(category, {}).get(function)
+        if handler is None:
+            return {"error": f"Unknown {category} function: {function}"}
         try:
-            if function == "get_day_notes":
-                return await AgenticToolsIntegrator._get_notes(user_id, params, context, db)
-            elif function == "add_note":
-                return await AgenticToolsIntegrator._add_note(user_id, params, context, db)
-            elif function == "get_notes_link":
-                return await AgenticToolsIntegrator._get_notes_link(user_id, params, context, db)
-            else:
-                return {"error": f"Unknown notes function: {function}"}
+            with tool_request_cache():
+                return await handler(user_id, params, context, db)
         except Exception as e:
             return {"error": str(e)}
     
+    @staticmethod
+    async def execute_notes_tool(user_id: int, function: str, params: Dict, context: str, db: Session) -> Dict[str, Any]:
+        """Execute notes-related tools"""
+        return await AgenticToolsIntegrator.execute("notes", user_id, function, params, context, db)
+    
     @staticmethod
     async def execute_youtube_tool(user_id: int, function: str, params: Dict, context: str, db: Session) -> Dict[str, Any]:
         """Execute YouTube-related tools"""
-        try:
-            if function == "search_videos":
-                return await AgenticToolsIntegrator._search_videos(user_id, params, context, db)
-            elif function == "create_playlist":
-                return await AgenticToolsIntegrator._create_playlist(user_id, params, context, db)
-            elif function == "add_to_playlist":
-                return await AgenticToolsIntegrator._add_to_playlist(user_id, params, context, db)
-            elif function == "summarize_video":
-                return await AgenticToolsIntegrator._summarize_video(user_id, params, context, db)
-            else:
-                return {"error": f"Unknown YouTube function: {function}"}
-        except Exception as e:
-            return {"error": str(e)}
+        return await AgenticToolsIntegrator.execute("youtube", user_id, function, params, context, db)
     
     @staticmethod
     async def execute_progress_tool(user_id: int, function: str, params: Dict, context: str, db: Session) -> Dict[str, Any]:
         """Execute progress-related tools"""
-        try:
-            if function == "get_progress":
-                return await AgenticToolsIntegrator._get_progress(user_id, params, context, db)
-            elif function == "recommend_next_step":
-                return await AgenticToolsIntegrator._recommend_next(user_id, params, context, db)
-            else:
-                return {"error": f"Unknown progress function: {function}"}
-        except Exception as e:
-            return {"error": str(e)}
+        return await AgenticToolsIntegrator.execute("progress", user_id, function, params, context, db)
+    
+    @staticmethod
+    async def execute_batch(user_id: int, calls: List[Tuple[str, str, Dict]], context: str = "", db: Optional[Session] = None) -> List[Dict[str, Any]]:
+        """Execute independent (category, function, params) tool calls concurrently.
+        
+        Results come back in call order; a failing call yields {"error": ...}
+        without cancelling the others. Handlers run on the caller's event loop and
+        push their Google/SQLite I/O to worker threads. A session passed in is
+        shared by every call; otherwise each call opens its own.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.TOOL_CONCURRENCY_LIMIT))
+        
+        async def _safe(category: str, function: str, params: Dict) -> Dict[str, Any]:
+            handler = _TOOL_DISPATCH.get((category, function))
+            if handler is None:
+                return {"error": f"Unknown {category} function: {function}"}
+            try:
+                async with semaphore:
+                    if db is not None:
+                        return await handler(user_id, params, context, db)
+                    with SessionLocal() as session:
+                        return await handler(user_id, params, context, session)
+            except Exception as e:
+                return {"error": str(e)}
+        
+        # gather's tasks copy the context, so every call sees the turn's cache
+        with tool_request_cache():
+            return await asyncio.gather(*[_safe(category, function, params or {}) for category, function, params in calls])
     
     # Notes tool implementations
     @staticmethod
@@ -279,22 +371,22 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract day and month from message or context
-        day_match = re.search(r'day\s*(\d+)', message.lower())
-        month_match = re.search(r'month\s*(\d+)', message.lower())
+        day_match = _DAY_RE.search(message)
+        month_match = _MONTH_RE.search(message)
         
         # Get user's current position if not specified
-        user = db.query(User).filter(User.id == user_id).first()
+        user = _get_user(db, user_id)
         if not user:
             return {"error": "User not found"}
         
         day = int(day_match.group(1)) if day_match else user.current_day
         month = int(month_match.group(1)) if month_match else user.current_month_index
         
-        notes_data = get_day_notes(user_id, month, day)
+        notes_data = await asyncio.to_thread(get_day_notes, user_id, month, day)
         
         if notes_data:
             # Store in memory
-            memory_manager.store_episodic(user_id, "get_notes", {
+            memory_manager.record_background(user_id, "get_notes", {
                 "day": day,
                 "month": month,
                 "notes_link": notes_data.get("link"),
@@ -325,7 +417,7 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract content to add
-        add_match = re.search(r'add\s+(.+?)\s+to\s+(?:day\s*(\d+))?', message.lower())
+        add_match = _ADD_NOTE_RE.search(message)
         if not add_match:
             return {"error": "Could not extract content to add"}
         
@@ -333,30 +425,21 @@ class AgenticToolsIntegrator:
         day = int(add_match.group(2)) if add_match.group(2) else None
         
         # Get user's current position if day not specified
-        user = db.query(User).filter(User.id == user_id).first()
+        user = _get_user(db, user_id)
         if not user:
             return {"error": "User not found"}
         
         target_day = day if day else user.current_day
         target_month = user.current_month_index
         
-        # Get existing notes
-        existing_notes = get_day_notes(user_id, target_month, target_day)
-        existing_content = existing_notes.get("content", "") if existing_notes else ""
-        
-        # Append new content
-        updated_content = f"{existing_content}\n\n{content_to_add}" if existing_content else content_to_add
+        # Append in one pass; the result carries the link so no re-fetch is needed
+        updated_notes = await asyncio.to_thread(append_day_notes, user_id, target_month, target_day, content_to_add)
         
-        # Update notes
-        success = update_day_notes(user_id, target_month, target_day, updated_content)
-        
-        if success:
-            # Get updated notes for link
-            updated_notes = get_day_notes(user_id, target_month, target_day)
-            link = updated_notes.get("link") if updated_notes else None
+        if updated_notes:
+            link = updated_notes.get("link")
             
             # Store in memory
-            memory_manager.store_episodic(user_id, "add_note", {
+            memory_manager.record_background(user_id, "add_note", {
                 "day": target_day,
                 "month": target_month,
                 "content_added": content_to_add,
@@ -402,15 +485,9 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract search query
-        search_patterns = [
-            r'(?:find|search|get|show).*?videos?.*?(?:about|on|for)\s+(.+?)(?:\.|$)',
-            r'(?:find|search|get|show)\s+(.+?)\s+videos?',
-            r'videos?\s+(?:about|on|for)\s+(.+?)(?:\.|$)'
-        ]
-        
         search_query = None
-        for pattern in search_patterns:
-            match = re.search(pattern, message.lower())
+        for pattern in _SEARCH_PATTERNS:
+            match = pattern.search(message)
             if match:
                 search_query = match.group(1).strip()
                 break
@@ -418,7 +495,7 @@ class AgenticToolsIntegrator:
         if not search_query:
             # Try to get current learning topic from context
             if "CurrentDayConcept:" in context:
-                concept_match = re.search(r'CurrentDayConcept:\s*(.+)', context)
+                concept_match = _CURRENT_CONCEPT_RE.search(context)
                 if concept_match:
                     search_query = f"tutorial {concept_match.group(1)}"
         
@@ -426,12 +503,12 @@ class AgenticToolsIntegrator:
             return {"error": "Could not determine search query"}
         
         # Search for videos
-        videos = search_youtube_videos(user_id, search_query, 5)
+        videos = await asyncio.to_thread(search_youtube_videos, user_id, search_query, 5)
         
         if videos:
             # Store in memory
             video_links = [video.get('url') for video in videos if video.get('url')]
-            memory_manager.store_episodic(user_id, "search_videos", {
+            memory_manager.record_background(user_id, "search_videos", {
                 "query": search_query,
                 "video_count": len(videos),
                 "video_links": video_links,
@@ -440,13 +517,16 @@ class AgenticToolsIntegrator:
             
             # Format response
             video_list = []
-            for i, video in enumerate(videos[:3]):  # Top 3 videos
+            for title, url, channel, seconds in (
+                (v.get('title'), v.get('url'), v.get('channel'), v.get('duration_seconds', 0)) for v in videos[:3]  # Top 3 videos
+            ):
+                minutes, seconds = divmod(seconds, 60)
                 video_list.append({
-                    "title": video.get('title'),
-                    "url": video.get('url'),
-                    "channel": video.get('channel'),
-                    "duration": f"{video.get('duration_seconds', 0) // 60}m{video.get('duration_seconds', 0) % 60}s",
-                    "markdown_link": f"[🎥 {video.get('title')}]({video.get('url')})"
+                    "title": title,
+                    "url": url,
+                    "channel": channel,
+                    "duration": f"{minutes}m{seconds}s",
+                    "markdown_link": f"[🎥 {title}]({url})"
                 })
             
             return {
@@ -454,7 +534,7 @@ class AgenticToolsIntegrator:
                 "query": search_query,
                 "video_count": len(videos),
                 "videos": video_list,
-                "top_video_link": videos[0].get('url') if videos else None,
+                "top_video_link": videos[0].get('url'),
                 "summary": f"Found {len(videos)} videos for '{search_query}'"
             }
         else:
@@ -471,9 +551,9 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract playlist name
-        playlist_match = re.search(r'create.*?playlist.*?(?:called|named)\s*["\'](.+?)["\']', message.lower())
+        playlist_match = _CREATE_PLAYLIST_RE.search(message)
         if not playlist_match:
-            playlist_match = re.search(r'playlist\s*["\'](.+?)["\']', message.lower())
+            playlist_match = _QUOTED_PLAYLIST_RE.search(message)
         
         if not playlist_match:
             return {"error": "Could not extract playlist name"}
@@ -482,11 +562,13 @@ class AgenticToolsIntegrator:
         description = f"Learning playlist for {playlist_name} created by EduAI"
         
         # Create playlist
-        result = create_playlist(user_id, playlist_name, description)
+        result = await asyncio.to_thread(create_playlist, user_id, playlist_name, description)
         
         if result and result.get('id') and 'error' not in result:
+            memory_manager.remember_playlist(user_id, playlist_name, result.get('id'))
+            
             # Store in memory
-            memory_manager.store_episodic(user_id, "create_playlist", {
+            memory_manager.record_background(user_id, "create_playlist", {
                 "playlist_name": playlist_name,
                 "playlist_id": result.get('id'),
                 "playlist_url": result.get('url')
@@ -514,15 +596,9 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract playlist name
-        playlist_patterns = [
-            r'add.*?to.*?playlist\s*["\'](.+?)["\']',
-            r'add.*?to\s+(.+?)\s*playlist',
-            r'add.*?to\s+(.+?)(?:\s|$)'
-        ]
-        
         playlist_name = None
-        for pattern in playlist_patterns:
-            match = re.search(pattern, message.lower())
+        for pattern in _PLAYLIST_PATTERNS:
+            match = pattern.search(message)
             if match:
                 playlist_name = match.group(1).strip()
                 break
@@ -530,45 +606,52 @@ class AgenticToolsIntegrator:
         if not playlist_name:
             return {"error": "Could not extract playlist name"}
         
+        # A playlist created moments ago is known without asking YouTube; otherwise
+        # start listing the user's playlists while the video is resolved
+        wanted = playlist_name.lower().strip()
+        playlist_id = memory_manager.recall_playlist(user_id, playlist_name)
+        playlists_task = None
+        if not playlist_id:
+            playlists_task = asyncio.create_task(asyncio.to_thread(_get_playlist_index, user_id))
+        
         # Get video ID - check for URL in message first
         video_id = None
-        video_url_match = re.search(r'(https?://(?:www\.)?youtube\.com/watch\?v=[\w-]+)', message)
+        video_url_match = _YT_URL_RE.search(message)
         
         if video_url_match:
             video_url = video_url_match.group(1)
             video_id = extract_video_id_from_url(video_url)
         else:
             # Try to get last video from memory
-            last_video_link = memory_manager.get_last_youtube_link(user_id)
+            last_video_link = await asyncio.to_thread(memory_manager.get_last_youtube_link, user_id)
             if last_video_link:
                 video_id = extract_video_id_from_url(last_video_link)
         
         if not video_id:
+            if playlists_task:
+                playlists_task.cancel()
             return {"error": "No video found to add. Please provide a YouTube URL or search for a video first."}
         
         # Get user's playlists to find the right one
-        playlists = get_user_playlists(user_id)
-        
-        playlist_id = None
-        for playlist in playlists:
-            if playlist.get('title', '').lower().strip() == playlist_name.lower().strip():
-                playlist_id = playlist.get('id')
-                break
+        if playlists_task:
+            playlist_index = await playlists_task
+            playlist_id = playlist_index.get(wanted)
         
         if not playlist_id:
             # Try to create the playlist
-            create_result = create_playlist(user_id, playlist_name, f"Learning playlist for {playlist_name}")
+            create_result = await asyncio.to_thread(create_playlist, user_id, playlist_name, f"Learning playlist for {playlist_name}")
             if create_result and create_result.get('id'):
                 playlist_id = create_result.get('id')
+                memory_manager.remember_playlist(user_id, playlist_name, playlist_id)
             else:
                 return {"error": f"Playlist '{playlist_name}' not found and could not be created"}
         
         # Add video to playlist
-        result = add_video_to_playlist(user_id, playlist_id, video_id)
+        result = await asyncio.to_thread(add_video_to_playlist, user_id, playlist_id, video_id)
         
         if result is True:
             # Store in memory
-            memory_manager.store_episodic(user_id, "add_to_playlist", {
+            memory_manager.record_background(user_id, "add_to_playlist", {
                 "playlist_name": playlist_name,
                 "video_id": video_id,
                 "video_url": f"https://www.youtube.com/watch?v={video_id}"
@@ -596,7 +679,7 @@ class AgenticToolsIntegrator:
         message = params.get("message", "")
         
         # Extract video URL or ID
-        video_url_match = re.search(r'(https?://(?:www\.)?youtube\.com/watch\?v=[\w-]+)', message)
+        video_url_match = _YT_URL_RE.search(message)
         video_id = None
         
         if video_url_match:
@@ -604,7 +687,7 @@ class AgenticToolsIntegrator:
             video_id = extract_video_id_from_url(video_url)
         else:
             # Try to get last video from memory
-            last_video_link = memory_manager.get_last_youtube_link(user_id)
+            last_video_link = await asyncio.to_thread(memory_manager.get_last_youtube_link, user_id)
             if last_video_link:
                 video_id = extract_video_id_from_url(last_video_link)
         
@@ -612,11 +695,11 @@ class AgenticToolsIntegrator:
             return {"error": "No video URL found to summarize"}
         
         # Get video summary
-        summary = get_video_summary(user_id, video_id)
+        summary = await asyncio.to_thread(get_video_summary, user_id, video_id)
         
         if summary:
             # Store in memory
-            memory_manager.store_episodic(user_id, "summarize_video", {
+            memory_manager.record_background(user_id, "summarize_video", {
                 "video_id": video_id,
                 "video_url": f"https://www.youtube.com/watch?v={video_id}",
                 "summary": summary[:200]  # Store first 200 chars
@@ -641,16 +724,22 @@ class AgenticToolsIntegrator:
     @staticmethod
     async def _get_progress(user_id: int, params: Dict, context: str, db: Session) -> Dict[str, Any]:
         """Get user's learning progress"""
+        # Reuse progress already computed this turn (e.g. get_progress then recommend_next_step)
+        cache = _request_cache.get()
+        if cache is not None and user_id in cache.progress:
+            return cache.progress[user_id]
+        
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = _get_user(db, user_id)
             if not user:
                 return {"error": "User not found"}
             
-            plan = db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
+            plan = _get_plan(db, user_id)
             if not plan:
                 return {"error": "Learning plan not found"}
             
             # Get progress summary
+            from app.core.learning_path_service import LearningPathService
             summary = LearningPathService.get_user_progress_summary(db, user_id, plan.id)
             
             progress_data = {
@@ -664,13 +753,16 @@ class AgenticToolsIntegrator:
             }
             
             # Store in memory
-            memory_manager.store_episodic(user_id, "get_progress", progress_data)
+            memory_manager.record_background(user_id, "get_progress", progress_data)
             
-            return {
+            result = {
                 "success": True,
                 "progress": progress_data,
                 "summary": f"You're {progress_data['overall_progress']}% through your learning plan"
             }
+            if cache is not None:
+                cache.progress[user_id] = result
+            return result
             
         except Exception as e:
             return {"error": str(e)}
@@ -707,5 +799,37 @@ class AgenticToolsIntegrator:
         except Exception as e:
             return {"error": str(e)}
 
+# Function name -> implementation, per tool category
+_NOTES_DISPATCH = {
+    "get_day_notes": AgenticToolsIntegrator._get_notes,
+    "add_note": AgenticToolsIntegrator._add_note,
+    "get_notes_link": AgenticToolsIntegrator._get_notes_link,
+}
+
+_YOUTUBE_DISPATCH = {
+    "search_videos": AgenticToolsIntegrator._search_videos,
+    "create_playlist": AgenticToolsIntegrator._create_playlist,
+    "add_to_playlist": AgenticToolsIntegrator._add_to_playlist,
+    "summarize_video": AgenticToolsIntegrator._summarize_video,
+}
+
+_PROGRESS_DISPATCH = {
+    "get_progress": AgenticToolsIntegrator._get_progress,
+    "recommend_next_step": AgenticToolsIntegrator._recommend_next,
+}
+
+_DISPATCH = {
+    "notes": _NOTES_DISPATCH,
+    "youtube": _YOUTUBE_DISPATCH,
+    "progress": _PROGRESS_DISPATCH,
+}
+
+# (category, function) -> implementation, used to validate and dispatch batched calls
+_TOOL_DISPATCH = {
+    (category, function): handler
+    for category, table in _DISPATCH.items()
+    for function, handler in table.items()
+}
+
 # Global tools integrator instance
 tools_integrator = AgenticToolsIntegrator()
\ No newline at end of file
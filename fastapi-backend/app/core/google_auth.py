@@ -1,5 +1,9 @@
 import os
+import time
 import requests
+from threading import Lock
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 from google_auth_oauthlib.flow import Flow
@@ -10,6 +14,15 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:3000/auth/google/callback")
 
+# One connection pool shared by every Google API session, so calls reuse open TLS connections
+_google_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+# Authorized sessions per google_id with the monotonic time their access token expires.
+# Only sessions built on a freshly refreshed token are cached, for at most 30 minutes.
+_session_cache: TTLCache = TTLCache(maxsize=1024, ttl=1800)
+_session_lock = Lock()
+# Stop reusing a cached session this many seconds before its token expires
+_TOKEN_EXPIRY_MARGIN = 60
+
 # Scopes for Gmail and other Google services needed for MCP
 SCOPES = [
     'openid',  # Required for Google OAuth
@@ -66,11 +79,33 @@ def verify_google_token(token):
     except Exception as e:
         raise ValueError(f'Invalid token: {str(e)}')
 
+def _new_google_session() -> requests.Session:
+    session = requests.Session()
+    session.mount('https://', _google_adapter)
+    return session
+
+_token_session = _new_google_session()
+
+def invalidate_google_session(google_id):
+    """Forget the cached session once the user's stored tokens change"""
+    with _session_lock:
+        _session_cache.pop(google_id, None)
+
+def _drop_session_on_unauthorized(google_id):
+    """Response hook that forgets the cached session once Google rejects its token"""
+    def hook(response, *args, **kwargs):
+        if response.status_code == 401:
+            invalidate_google_session(google_id)
+    return hook
+
 def get_google_oauth2_session(google_id):
     """Get OAuth2 session for Google API calls with token refresh capability"""
+    with _session_lock:
+        cached = _session_cache.get(google_id)
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
     try:
         import requests
-        import time
         from app.database.db import get_db
         from app.models.user import User
         from sqlalchemy.orm import Session
@@ -88,6 +123,7 @@ def get_google_oauth2_session(google_id):
             
         # Check if we need to refresh the token
         # If we have a refresh token and the access token might be expired
+        expires_at = None
         if user.google_refresh_token:
             try:
                 # Try to refresh the token
@@ -98,7 +134,7 @@ def get_google_oauth2_session(google_id):
                     'grant_type': 'refresh_token'
                 }
                 
-                refresh_response = requests.post(
+                refresh_response = _token_session.post(
                     'https://oauth2.googleapis.com/token',
                     data=refresh_payload
                 )
@@ -108,18 +144,24 @@ def get_google_oauth2_session(google_id):
                     # Update the access token in the database
                     user.google_access_token = token_data['access_token']
                     db.commit()
+                    expires_at = time.monotonic() + token_data.get('expires_in', 3600) - _TOKEN_EXPIRY_MARGIN
                     print("Successfully refreshed Google access token")
             except Exception as refresh_error:
                 print(f"Error refreshing token: {refresh_error}")
                 # Continue with the existing token
         
         # Create a session for Google API calls
-        session = requests.Session()
+        session = _new_google_session()
         session.headers.update({
             'Authorization': f'Bearer {user.google_access_token}',
             'Content-Type': 'application/json'
         })
+        session.hooks['response'].append(_drop_session_on_unauthorized(google_id))
         
+        # A token we couldn't refresh may already be stale, so don't hold on to it
+        if expires_at is not None:
+            with _session_lock:
+                _session_cache[google_id] = (session, expires_at)
         return session
     except Exception as e:
         raise ValueError(f"Failed to create Google OAuth session: {str(e)}")
@@ -4,10 +4,19 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Union
+from threading import Lock
+from cachetools import TTLCache
 from app.core.google_auth import get_google_oauth2_session
 from app.models.user import User
 from app.database.db import get_db
 
+# Day notes resolved from Drive, keyed by (user_id, month_index, day)
+_day_notes_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+_day_notes_lock = Lock()
+# Drive folder IDs keyed by (user_id, parent_id, folder_name); folders are created once and rarely move
+_folder_id_cache: TTLCache = TTLCache(maxsize=4096, ttl=600)
+_folder_id_lock = Lock()
+
 
 def _get_session_for_user(user_id: int):
     db = next(get_db())
@@ -17,17 +26,41 @@ def _get_session_for_user(user_id: int):
     return get_google_oauth2_session(user.google_id)
 
 
-def ensure_drive_folder(user_id: int, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
+def _drive_query_string(value: str) -> str:
+    """Escape a value for use inside a single-quoted Drive query string"""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def find_drive_folder(user_id: int, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
+    """Look up a folder by name (and parent) with one targeted query, reusing recent results"""
+    key = (int(user_id), parent_id, folder_name)
+    with _folder_id_lock:
+        folder_id = _folder_id_cache.get(key)
+    if folder_id:
+        return folder_id
     try:
         session = _get_session_for_user(user_id)
-        # Search for folder by name
-        q = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        q = f"name='{_drive_query_string(folder_name)}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
         if parent_id:
             q += f" and '{parent_id}' in parents"
-        search = session.get('https://www.googleapis.com/drive/v3/files', params={'q': q}).json()
+        search = session.get('https://www.googleapis.com/drive/v3/files', params={'q': q, 'fields': 'files(id)'}).json()
         files = search.get('files', [])
         if files:
-            return files[0]['id']
+            folder_id = files[0]['id']
+            with _folder_id_lock:
+                _folder_id_cache[key] = folder_id
+            return folder_id
+    except Exception as e:
+        print(f"Drive find folder error: {e}")
+    return None
+
+
+def ensure_drive_folder(user_id: int, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
+    folder_id = find_drive_folder(user_id, folder_name, parent_id)
+    if folder_id:
+        return folder_id
+    try:
+        session = _get_session_for_user(user_id)
         # Create folder
         payload = {
             'name': folder_name,
@@ -37,7 +70,11 @@ def ensure_drive_folder(user_id: int, folder_name: str, parent_id: Optional[str]
             payload['parents'] = [parent_id]
         resp = session.post('https://www.googleapis.com/drive/v3/files', data=json.dumps(payload))
         if resp.status_code in (200, 201):
-            return resp.json().get('id')
+            folder_id = resp.json().get('id')
+            if folder_id:
+                with _folder_id_lock:
+                    _folder_id_cache[(int(user_id), parent_id, folder_name)] = folder_id
+            return folder_id
     except Exception as e:
         print(f"Drive ensure folder error: {e}")
     return None
@@ -99,7 +136,7 @@ def list_drive_files(user_id: int, folder_name: Optional[str] = None, parent_id:
         
         # If folder name is provided, first find the folder ID
         if folder_name and not parent_id:
-            folder_query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+            folder_query = f"name='{_drive_query_string(folder_name)}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
             folder_search = session.get('https://www.googleapis.com/drive/v3/files', params={'q': folder_query}).json()
             folder_files = folder_search.get('files', [])
             if folder_files:
@@ -148,6 +185,28 @@ def get_drive_file_content(user_id: int, file_id: str) -> Optional[str]:
 
 
 def get_day_notes(user_id: int, month_index: int, day: int) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve notes for a specific day, reusing a recent Drive lookup when available.
+    Returns a dictionary with content, file_id and link if found.
+    """
+    key = (int(user_id), month_index, day)
+    with _day_notes_lock:
+        notes = _day_notes_cache.get(key)
+    if notes is None:
+        notes = _fetch_day_notes(user_id, month_index, day)
+        if notes is not None and notes.get("content") is not None:
+            with _day_notes_lock:
+                _day_notes_cache[key] = notes
+    return notes
+
+
+def invalidate_day_notes(user_id: int, month_index: int, day: int):
+    """Forget cached notes for a day once its Drive file has been written"""
+    with _day_notes_lock:
+        _day_notes_cache.pop((int(user_id), month_index, day), None)
+
+
+def _fetch_day_notes(user_id: int, month_index: int, day: int) -> Optional[Dict[str, Any]]:
     """
     Helper function to retrieve notes for a specific day from Google Drive.
     First finds the root folder, then the month folder, then the day notes file.
@@ -167,15 +226,7 @@ def get_day_notes(user_id: int, month_index: int, day: int) -> Optional[Dict[str
         print(f"Looking for root folder: {root_name}")
         
         # Find root folder
-        root_id = None
-        root_folders = list_drive_files(user_id)
-        print(f"Found {len(root_folders)} root level folders")
-        for folder in root_folders:
-            if folder.get('name') == root_name and folder.get('mimeType') == 'application/vnd.google-apps.folder':
-                root_id = folder.get('id')
-                print(f"Found root folder with ID: {root_id}")
-                break
-        
+        root_id = find_drive_folder(user_id, root_name)
         if not root_id:
             print(f"Root folder '{root_name}' not found")
             return None
@@ -183,15 +234,7 @@ def get_day_notes(user_id: int, month_index: int, day: int) -> Optional[Dict[str
         # Find month folder
         month_folder_name = f"MONTH_{month_index}"
         print(f"Looking for month folder: {month_folder_name}")
-        month_id = None
-        month_folders = list_drive_files(user_id, parent_id=root_id)
-        print(f"Found {len(month_folders)} folders in root")
-        for folder in month_folders:
-            if folder.get('name') == month_folder_name and folder.get('mimeType') == 'application/vnd.google-apps.folder':
-                month_id = folder.get('id')
-                print(f"Found month folder with ID: {month_id}")
-                break
-                
+        month_id = find_drive_folder(user_id, month_folder_name, parent_id=root_id)
         if not month_id:
             print(f"Month folder '{month_folder_name}' not found")
             return None
@@ -223,17 +266,40 @@ def get_day_notes(user_id: int, month_index: int, day: int) -> Optional[Dict[str
         return None
 
 
-def update_day_notes(user_id: int, month_index: int, day: int, content: str) -> bool:
+def _update_drive_file(user_id: int, file_id: str, name: str, content: str) -> bool:
+    """Replace the content of an existing Drive file with a single multipart PATCH."""
+    session = _get_session_for_user(user_id)
+    metadata = {'name': name}
+    files_endpoint = f'https://www.googleapis.com/upload/drive/v3/files/{file_id}?uploadType=multipart'
+    boundary = 'foo_bar_baz'
+    body = (
+        f'--{boundary}\r\n'
+        'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+        f'{json.dumps(metadata)}\r\n'
+        f'--{boundary}\r\n'
+        'Content-Type: text/plain; charset=UTF-8\r\n\r\n'
+        f'{content}\r\n'
+        f'--{boundary}--'
+    )
+    headers = {
+        'Content-Type': f'multipart/related; boundary={boundary}'
+    }
+    resp = session.patch(files_endpoint, data=body.encode('utf-8'), headers=headers)
+    return resp.status_code in (200, 201)
+
+
+def update_day_notes(user_id: int, month_index: int, day: int, content: str) -> Optional[Dict[str, Any]]:
     """
     Update or create notes for a specific day in Google Drive.
     First ensures the folder structure exists, then creates or updates the file.
+    Returns a dictionary with content, file_id and link, or None on failure.
     """
     try:
         # Get user info to construct root folder name
         db = next(get_db())
         user = db.query(User).filter(User.id == int(user_id)).first()
         if not user:
-            return False
+            return None
             
         # Construct root folder name
         root_name = f"EDUAI_{(user.google_name or user.email or 'USER').split(' ')[0]}_LEARNING_MAIN_PATH"
@@ -241,13 +307,13 @@ def update_day_notes(user_id: int, month_index: int, day: int, content: str) ->
         # Ensure root folder exists
         root_id = ensure_drive_folder(user_id, root_name)
         if not root_id:
-            return False
+            return None
             
         # Ensure month folder exists
         month_folder_name = f"MONTH_{month_index}"
         month_id = ensure_drive_folder(user_id, month_folder_name, parent_id=root_id)
         if not month_id:
-            return False
+            return None
             
         # Check if day notes file already exists
         day_file_name = f"DAY_{day}_NOTES.txt"
@@ -259,35 +325,85 @@ def update_day_notes(user_id: int, month_index: int, day: int, content: str) ->
                 file_id = file.get('id')
                 break
                 
-        # If file exists, update it (would need to implement update method)
+        # If file exists, overwrite its content in place
         if file_id:
-            # This would require implementing a file update method
-            # For now, we'll just create a new file with the same name
-            session = _get_session_for_user(user_id)
-            metadata = {'name': day_file_name}
-            files_endpoint = f'https://www.googleapis.com/upload/drive/v3/files/{file_id}?uploadType=multipart'
-            boundary = 'foo_bar_baz'
-            body = (
-                f'--{boundary}\r\n'
-                'Content-Type: application/json; charset=UTF-8\r\n\r\n'
-                f'{json.dumps(metadata)}\r\n'
-                f'--{boundary}\r\n'
-                'Content-Type: text/plain; charset=UTF-8\r\n\r\n'
-                f'{content}\r\n'
-                f'--{boundary}--'
-            )
-            headers = {
-                'Content-Type': f'multipart/related; boundary={boundary}'
-            }
-            resp = session.patch(files_endpoint, data=body.encode('utf-8'), headers=headers)
-            return resp.status_code in (200, 201)
+            if not _update_drive_file(user_id, file_id, day_file_name, content):
+                return None
         else:
             # Create new file
-            new_file_id = create_drive_file(user_id, day_file_name, content, parent_id=month_id)
-            return new_file_id is not None
+            file_id = create_drive_file(user_id, day_file_name, content, parent_id=month_id)
+            if file_id is None:
+                return None
+        
+        # Remember what was written so a follow-up lookup doesn't go back to Drive
+        notes = {
+            "content": content,
+            "file_id": file_id,
+            "link": f"https://drive.google.com/file/d/{file_id}/view"
+        }
+        with _day_notes_lock:
+            _day_notes_cache[(int(user_id), month_index, day)] = notes
+        return notes
     except Exception as e:
         print(f"Update day notes error: {e}")
-        return False
+        return None
+
+
+def append_day_notes(user_id: int, month_index: int, day: int, text: str) -> Optional[Dict[str, Any]]:
+    """
+    Append text to the notes for a specific day, creating the file if needed.
+    Resolves the folder structure once and reads the existing content only when
+    the file exists, so callers don't need separate get/update/get round trips.
+    Returns a dictionary with content, file_id and link, or None on failure.
+    """
+    try:
+        # Get user info to construct root folder name
+        db = next(get_db())
+        user = db.query(User).filter(User.id == int(user_id)).first()
+        if not user:
+            return None
+        
+        # Construct root folder name
+        root_name = f"EDUAI_{(user.google_name or user.email or 'USER').split(' ')[0]}_LEARNING_MAIN_PATH"
+        
+        # Ensure root and month folders exist
+        root_id = ensure_drive_folder(user_id, root_name)
+        if not root_id:
+            return None
+        month_id = ensure_drive_folder(user_id, f"MONTH_{month_index}", parent_id=root_id)
+        if not month_id:
+            return None
+        
+        # Find the day notes file
+        day_file_name = f"DAY_{day}_NOTES.txt"
+        file_id = None
+        for file in list_drive_files(user_id, parent_id=month_id):
+            if file.get('name') == day_file_name:
+                file_id = file.get('id')
+                break
+        
+        if file_id:
+            existing_content = get_drive_file_content(user_id, file_id) or ""
+            content = f"{existing_content}\n\n{text}" if existing_content else text
+            if not _update_drive_file(user_id, file_id, day_file_name, content):
+                return None
+        else:
+            content = text
+            file_id = create_drive_file(user_id, day_file_name, content, parent_id=month_id)
+            if not file_id:
+                return None
+        
+        notes = {
+            "content": content,
+            "file_id": file_id,
+            "link": f"https://drive.google.com/file/d/{file_id}/view"
+        }
+        with _day_notes_lock:
+            _day_notes_cache[(int(user_id), month_index, day)] = notes
+        return notes
+    except Exception as e:
+        print(f"Append day notes error: {e}")
+        return None
 
 
 def send_email(user_id: int, to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> bool:
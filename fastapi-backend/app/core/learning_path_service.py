@@ -1,10 +1,16 @@
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, Dict, Any
+from threading import Lock
+from cachetools import TTLCache
 from app.models.learning_path import LearningPath, DayProgress
 from app.models.learning_plan import LearningPlan
 from app.models.user import User
 
+# Progress rollups keyed by (user_id, plan_id); dropped whenever day progress changes
+_summary_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+_summary_lock = Lock()
+
 
 class LearningPathService:
     """Service for managing learning path progression and day advancement"""
@@ -36,6 +42,7 @@ class LearningPathService:
             db.add(day_progress)
             db.commit()
             db.refresh(day_progress)
+            LearningPathService.invalidate_progress_summary(user_id, plan_id)
         
         return day_progress
     
@@ -87,6 +94,7 @@ class LearningPathService:
             }
         
         db.commit()
+        LearningPathService.invalidate_progress_summary(user_id, plan_id)
         db.refresh(day_progress)
         return day_progress
     
@@ -179,6 +187,7 @@ class LearningPathService:
                 user.current_month_index = next_day_info["month_index"]
         
         db.commit()
+        LearningPathService.invalidate_progress_summary(user_id, plan_id)
         
         return {
             "day_completed": True,
@@ -225,13 +234,34 @@ class LearningPathService:
         
         return None
     
+    @staticmethod
+    def invalidate_progress_summary(user_id: int, plan_id: int):
+        """Forget the cached progress summary once day progress has changed"""
+        with _summary_lock:
+            _summary_cache.pop((user_id, plan_id), None)
+    
     @staticmethod
     def get_user_progress_summary(
         db: Session, 
         user_id: int, 
         plan_id: int
     ) -> Dict[str, Any]:
-        """Get a summary of user's progress across all months and days"""
+        """Get a summary of user's progress across all months and days (cached briefly; treat as read-only)"""
+        key = (user_id, plan_id)
+        with _summary_lock:
+            summary = _summary_cache.get(key)
+        if summary is None:
+            summary = LearningPathService._compute_progress_summary(db, user_id, plan_id)
+            with _summary_lock:
+                _summary_cache[key] = summary
+        return summary
+    
+    @staticmethod
+    def _compute_progress_summary(
+        db: Session, 
+        user_id: int, 
+        plan_id: int
+    ) -> Dict[str, Any]:
         # Get all day progress for this plan
         day_progress_list = db.query(DayProgress).filter(
             DayProgress.user_id == user_id,
@@ -3,8 +3,8 @@ MCP-based LinkedIn Integration for EduAI
 Uses third-party services for simplified LinkedIn posting
 """
 
-import requests
 import json
+from urllib.parse import quote
 from typing import Dict, Any, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
@@ -12,102 +12,96 @@ from app.models.user import User
 from app.models.quiz import QuizSubmission
 from app.models.learning_plan import LearningPlan
 from app.core.learning_path_service import LearningPathService
-from app.database.db import get_db
+from app.database.db import SessionLocal
 import logging
 
 logger = logging.getLogger(__name__)
 
+_LINKEDIN_SHARE_PREFIX = "https://www.linkedin.com/sharing/share-offsite/?url=https://eduai.com&text="
+
+# Fixed parts of the generated posts; only the header, focus and stats lines vary
+_TOPIC_POST_TAGLINE = "Amazing how EduAI breaks down complex topics into digestible lessons! "
+_DAY_POST_TAGLINE = "Loving the structured approach with EduAI - it's making complex topics digestible and engaging! "
+_POST_HASHTAGS = "#Learning #AI #Education #TechSkills #ContinuousLearning #EduAI"
+
 class MCPLinkedInService:
     def __init__(self):
         # MCP approach - no external APIs needed
         pass
     
-    def generate_learning_post(self, user_id: int, day: int, custom_topic: str = None) -> str:
-        """Generate LinkedIn post content"""
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
-            plan = db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
-            
-            if not user or not plan:
-                return "🎓 Continuing my learning journey with EduAI! #Learning #AI #Education"
-            
-            # Get current day concept
-            months = plan.plan.get("months", []) if isinstance(plan.plan, dict) else []
-            current_concept = "New concepts"
-            
-            if user.current_month_index <= len(months):
-                current_month = months[user.current_month_index - 1]
-                days = current_month.get("days", [])
-                if day <= len(days):
-                    current_day_data = days[day - 1]
-                    current_concept = current_day_data.get("concept", "New concepts")
-            
-            # Get quiz score
-            quiz_text = ""
-            recent_quiz = db.query(QuizSubmission).filter(
-                QuizSubmission.user_id == user_id,
-                QuizSubmission.day == day,
-                QuizSubmission.month_index == user.current_month_index
-            ).order_by(QuizSubmission.created_at.desc()).first()
-            
-            if recent_quiz:
-                quiz_text = f" Quiz Score: {recent_quiz.score}% {'✅' if recent_quiz.passed else '📚'}"
-            
-            # Get overall progress
-            summary = LearningPathService.get_user_progress_summary(db, user_id, plan.id)
-            progress_percent = summary.get('overall_progress_percentage', 0)
-            
-            # Use custom topic if provided
-            if custom_topic:
-                current_concept = custom_topic
-                post_content = f"""🎓 Just learned about {custom_topic}! 
-
-📚 Key Focus: {current_concept}
-{quiz_text}
-📊 Overall Progress: {progress_percent}%
-
-Amazing how EduAI breaks down complex topics into digestible lessons! 
-
-#Learning #AI #Education #TechSkills #ContinuousLearning #EduAI"""
-            else:
-                # Generate post content
-                post_content = f"""🎓 Day {day} of my {plan.title} learning journey completed! 
-
-📚 Today's Focus: {current_concept}
-{quiz_text}
-📊 Overall Progress: {progress_percent}%
-
-Loving the structured approach with EduAI - it's making complex topics digestible and engaging! 
-
-#Learning #AI #Education #TechSkills #ContinuousLearning #EduAI"""
-            
-            return post_content
-            
-        finally:
-            db.close()
+    def generate_learning_post(self, user_id: int, day: int, custom_topic: str = None, db: Optional[Session] = None) -> str:
+        """Generate LinkedIn post content, using the caller's session when given"""
+        if db is not None:
+            return self._build_learning_post(db, user_id, day, custom_topic)
+        with SessionLocal() as db:
+            return self._build_learning_post(db, user_id, day, custom_topic)
+    
+    def _build_learning_post(self, db: Session, user_id: int, day: int, custom_topic: str = None) -> str:
+        # Latest submission for this day of the user's current month (served by the composite index)
+        latest_quiz_id = db.query(QuizSubmission.id).filter(
+            QuizSubmission.user_id == User.id,
+            QuizSubmission.day == day,
+            QuizSubmission.month_index == User.current_month_index
+        ).order_by(QuizSubmission.created_at.desc()).limit(1).correlate(User).scalar_subquery()
+        
+        # User, plan and that quiz submission in one round-trip
+        row = db.query(User, LearningPlan, QuizSubmission).join(
+            LearningPlan, LearningPlan.user_id == User.id
+        ).outerjoin(
+            QuizSubmission, QuizSubmission.id == latest_quiz_id
+        ).filter(User.id == user_id).first()
+        
+        if not row:
+            return "🎓 Continuing my learning journey with EduAI! #Learning #AI #Education"
+        user, plan, recent_quiz = row
+        
+        # Get current day concept (a custom topic replaces it)
+        months = plan.plan.get("months", []) if isinstance(plan.plan, dict) else []
+        current_concept = "New concepts"
+        
+        if not custom_topic and user.current_month_index <= len(months):
+            current_month = months[user.current_month_index - 1]
+            days = current_month.get("days", [])
+            if day <= len(days):
+                current_day_data = days[day - 1]
+                current_concept = current_day_data.get("concept", "New concepts")
+        
+        # Get quiz score
+        quiz_text = ""
+        if recent_quiz:
+            quiz_text = f" Quiz Score: {recent_quiz.score}% {'✅' if recent_quiz.passed else '📚'}"
+        
+        # Get overall progress
+        summary = LearningPathService.get_user_progress_summary(db, user_id, plan.id)
+        progress_percent = summary.get('overall_progress_percentage', 0)
+        
+        # Use custom topic if provided
+        if custom_topic:
+            header = f"🎓 Just learned about {custom_topic}! "
+            focus = f"📚 Key Focus: {custom_topic}"
+            tagline = _TOPIC_POST_TAGLINE
+        else:
+            header = f"🎓 Day {day} of my {plan.title} learning journey completed! "
+            focus = f"📚 Today's Focus: {current_concept}"
+            tagline = _DAY_POST_TAGLINE
+        
+        return f"{header}\n\n{focus}\n{quiz_text}\n📊 Overall Progress: {progress_percent}%\n\n{tagline}\n\n{_POST_HASHTAGS}"
     
 
     
     def generate_shareable_link(self, content: str, user_id: int) -> str:
         """Generate a shareable link for manual posting"""
-        # URL encode the content for LinkedIn sharing
-        import urllib.parse
-        encoded_content = urllib.parse.quote(content)
-        
-        # LinkedIn share URL
-        linkedin_share_url = f"https://www.linkedin.com/sharing/share-offsite/?url=https://eduai.com&text={encoded_content}"
-        
-        return linkedin_share_url
+        # LinkedIn share URL with the URL-encoded content
+        return _LINKEDIN_SHARE_PREFIX + quote(content)
 
 # Global MCP LinkedIn service instance
 mcp_linkedin_service = MCPLinkedInService()
 
-def post_to_linkedin_mcp(user_id: int, day: int, method: str = "link", custom_topic: str = None) -> Dict[str, Any]:
+def post_to_linkedin_mcp(user_id: int, day: int, method: str = "link", custom_topic: str = None, db: Optional[Session] = None) -> Dict[str, Any]:
     """Post learning progress to LinkedIn using MCP approach"""
     try:
         # Generate post content
-        content = mcp_linkedin_service.generate_learning_post(user_id, day, custom_topic)
+        content = mcp_linkedin_service.generate_learning_post(user_id, day, custom_topic, db=db)
         
         # Generate shareable link for manual posting
         share_link = mcp_linkedin_service.generate_shareable_link(content, user_id)
@@ -1,38 +1,41 @@
 import openai
+import httpx
+import orjson
 from app.core.config import settings
-import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-import json
+import re
 import asyncio
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from datetime import datetime
+from secrets import token_hex
+from typing import Dict, List, Optional, Any, Final, AsyncIterator, Tuple
+from app.core.response_cache import ResponseCache
+from app.core.agent_memory import memory_manager
+from app.core.agentic_tools import tool_request_cache, get_notes_tool, search_youtube_tool, get_progress_tool
 
-# OpenAI client will be initialized per request
+# One pooled async client per process; None until an API key is configured
+_client: Optional[openai.AsyncOpenAI] = openai.AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+) if settings.OPENAI_API_KEY else None
 
-@dataclass
-class AgentState:
-    messages: List[Dict]
-    user_id: int
-    context: str
-    tool_calls: List[Dict]
-    memory_context: Dict
-    next_action: str
+_GENERATION_FAILED = "I'm having trouble generating a response. Please try again."
 
-class AgenticOpenAIChatbot:
-    def __init__(self):
-        self.model = settings.OPENAI_MODEL
-        self.chat_sessions: Dict[str, List[Dict]] = {}
-        self.workflow = self._create_workflow()
-    
-    def get_or_create_session(self, user_id: int) -> List[Dict]:
-        """Get existing chat session or create new one for user"""
-        session_key = f"user_{user_id}"
-        
-        if session_key not in self.chat_sessions:
-            # Create new chat session with system message
-            self.chat_sessions[session_key] = [{
-                "role": "system",
-                "content": """
+# Answers to near-duplicate questions (same user and learning context) are reused
+_response_cache = ResponseCache(threshold=settings.RESPONSE_CACHE_THRESHOLD)
+
+# Chat sessions are bounded: idle ones expire, the least recently used are evicted
+# past the cap, and each keeps only the most recent turns
+_SESSION_TTL = 3600.0
+_MAX_SESSIONS = 1000
+_MAX_SESSION_MESSAGES = 20
+
+# Prompt history sent per request: at most the last 10 messages and roughly
+# 4000 tokens (~4 characters each); the newest message is always included
+_HISTORY_WINDOW = 10
+_HISTORY_CHAR_BUDGET = 16000
+
+_SYSTEM_PROMPT: Final[str] = """
 You are EduAI, an autonomous, memory-augmented learning companion and tool-using agent. 
 
 CRITICAL FORMATTING RULES - FOLLOW THESE EXACTLY:
@@ -99,50 +102,101 @@ You are an autonomous agent that can:
 
 Remember: Your responses should be well-formatted, educational, and include practical examples!
 """
-            }]
+
+# Intent keywords -> tool tag, matched as substrings in one case-insensitive pass;
+# the lookahead lets overlapping keywords (e.g. "how today") each be seen
+_INTENT_KEYWORDS = {
+    "youtube": ('learn', 'understand', 'explain', 'help', 'tutorial', 'how to'),
+    "notes": ('notes', 'day'),
+}
+_INTENT_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{tag}>{'|'.join(map(re.escape, keywords))})" for tag, keywords in _INTENT_KEYWORDS.items()
+    ) + ")",
+    re.IGNORECASE
+)
+
+# Messages asking for help with a concept, recorded as learning interactions
+_LEARNING_HELP_RE = re.compile(r'help|explain|understand|confused', re.IGNORECASE)
+
+# Whitespace around a paragraph break, collapsed to a single blank line
+_PARAGRAPH_BREAK_RE = re.compile(r'\s*\n\n\s*')
+
+# Shared by every session and prepended per request rather than stored per user
+_SYSTEM_MESSAGE: Final[Dict[str, str]] = {"role": "system", "content": _SYSTEM_PROMPT}
+
+class AgenticOpenAIChatbot:
+    def __init__(self):
+        self.model = settings.OPENAI_MODEL
+        self.chat_sessions: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._session_touched: Dict[str, float] = {}
+    
+    def get_or_create_session(self, user_id: int) -> List[Dict]:
+        """Get existing chat session or create new one for user"""
+        session_key = f"user_{user_id}"
+        now = time.monotonic()
+        self._evict_sessions(now)
+        
+        if session_key not in self.chat_sessions:
+            self.chat_sessions[session_key] = []
         
+        self.chat_sessions.move_to_end(session_key)
+        self._session_touched[session_key] = now
         return self.chat_sessions[session_key]
     
+    def _evict_sessions(self, now: float):
+        """Drop expired sessions and the least recently used ones beyond the cap"""
+        while self.chat_sessions:
+            oldest_key = next(iter(self.chat_sessions))
+            expired = now - self._session_touched.get(oldest_key, 0.0) > _SESSION_TTL
+            if not expired and len(self.chat_sessions) < _MAX_SESSIONS:
+                break
+            self.chat_sessions.popitem(last=False)
+            self._session_touched.pop(oldest_key, None)
+    
+    @staticmethod
+    def _append_turn(chat_session: List[Dict], role: str, content: str):
+        """Append a message, keeping only the most recent turns"""
+        chat_session.append({"role": role, "content": content})
+        overflow = len(chat_session) - _MAX_SESSION_MESSAGES
+        if overflow > 0:
+            del chat_session[:overflow]
+    
+    @staticmethod
+    def _history_window(chat_session: List[Dict]) -> List[Dict]:
+        """Most recent messages that fit the prompt history budget"""
+        window = chat_session[-_HISTORY_WINDOW:]
+        budget = _HISTORY_CHAR_BUDGET
+        start = len(window)
+        while start > 0:
+            budget -= len(window[start - 1]["content"])
+            if budget < 0 and start < len(window):
+                break
+            start -= 1
+        return window[start:]
+    
     def _format_response(self, response_text: str) -> str:
         """Format the response for better readability"""
         # Clean up any extra whitespace
         response_text = response_text.strip()
+        if '\n\n' not in response_text:
+            return response_text
         
-        # Ensure proper paragraph spacing
-        paragraphs = response_text.split('\n\n')
-        formatted_paragraphs = []
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if paragraph:
-                # Ensure bullet points are properly formatted
-                if paragraph.startswith('•') or paragraph.startswith('-'):
-                    # Keep bullet points as is
-                    formatted_paragraphs.append(paragraph)
-                elif paragraph.startswith(('1.', '2.', '3.', '4.', '5.')):
-                    # Keep numbered lists as is
-                    formatted_paragraphs.append(paragraph)
-                else:
-                    # Add proper spacing for regular paragraphs
-                    formatted_paragraphs.append(paragraph)
-        
-        return '\n\n'.join(formatted_paragraphs)
-    
-    def _create_workflow(self):
-        """Create simple workflow orchestration"""
-        return self  # Simplified - no LangGraph for now
+        # Ensure proper paragraph spacing: exactly one blank line, no padding around it
+        return _PARAGRAPH_BREAK_RE.sub('\n\n', response_text)
     
     async def _get_memory_context(self, user_id: int, message: str) -> Dict:
         """Get memory context for user"""
         try:
-            from app.core.agent_memory import memory_manager
-            
-            conversation_memory = memory_manager.recall_conversation(user_id, 5)
-            episodic_memory = memory_manager.recall_episodic(user_id)
+            # SQLite reads run off the event loop so they overlap with tool execution
+            conversation_memory, episodic_memory = await asyncio.gather(
+                asyncio.to_thread(memory_manager.recall_conversation, user_id, 5),
+                asyncio.to_thread(memory_manager.recall_episodic, user_id, limit=5)
+            )
             
             return {
                 "conversation": conversation_memory,
-                "episodic": episodic_memory[:5],
+                "episodic": episodic_memory,
                 "semantic": [],
                 "graph": {}
             }
@@ -153,54 +207,53 @@ Remember: Your responses should be well-formatted, educational, and include prac
     def _parse_intent(self, message: str) -> List[Dict]:
         """Fast intent parsing with auto-suggestions"""
         tools = []
-        msg_lower = message.lower()
+        tags = set()
+        for match in _INTENT_RE.finditer(message):
+            tags.add(match.lastgroup)
+            if len(tags) == len(_INTENT_KEYWORDS):
+                break
         
         # Auto-suggest videos for learning topics
-        learning_keywords = ['learn', 'understand', 'explain', 'help', 'tutorial', 'how to']
-        if any(kw in msg_lower for kw in learning_keywords):
+        if "youtube" in tags:
             tools.append({"tool": "youtube", "function": "search_videos", "params": {"message": message}})
         
         # Notes intent (simplified)
-        if 'notes' in msg_lower or 'day' in msg_lower:
+        if "notes" in tags:
             tools.append({"tool": "notes", "function": "get_notes", "params": {"message": message}})
         
         return tools
     
     async def _execute_tools(self, tool_calls: List[Dict], user_id: int, context: str) -> List[Dict]:
-        """Execute tools directly"""
-        results = []
-        
-        for tool_call in tool_calls:
-            try:
-                tool_name = tool_call.get("tool")
-                function_name = tool_call.get("function")
-                params = tool_call.get("params", {})
-                
-                # Simple tool execution
-                if tool_name == "notes" and function_name == "get_notes":
-                    from app.core.agentic_tools import get_notes_tool
-                    result = get_notes_tool(params.get("message", ""), user_id)
-                elif tool_name == "youtube" and function_name == "search_videos":
-                    from app.core.agentic_tools import search_youtube_tool
-                    result = search_youtube_tool(params.get("message", ""), user_id)
-                elif tool_name == "progress" and function_name == "get_progress":
-                    from app.core.agentic_tools import get_progress_tool
-                    result = get_progress_tool(user_id)
-                else:
-                    result = {"error": f"Unknown tool: {tool_name}_{function_name}"}
-                
-                results.append(result)
-                
-            except Exception as e:
-                results.append({"error": str(e)})
-        
-        return results
+        """Execute tools concurrently, each in a worker thread, preserving call order"""
+        with tool_request_cache():
+            return list(await asyncio.gather(
+                *(asyncio.to_thread(self._run_tool, tool_call, user_id) for tool_call in tool_calls)
+            ))
     
-    async def _generate_response(self, message: str, user_id: int, memory_context: Dict, tool_results: List[Dict]) -> str:
-        """Generate response using OpenAI with comprehensive learning context"""
+    @staticmethod
+    def _run_tool(tool_call: Dict, user_id: int) -> Dict:
+        """Run a single blocking tool call, turning failures into an error result"""
         try:
-            # Build enhanced response prompt with learning analytics
-            response_prompt = f"""
+            tool_name = tool_call.get("tool")
+            function_name = tool_call.get("function")
+            params = tool_call.get("params", {})
+            
+            # Simple tool execution
+            if tool_name == "notes" and function_name == "get_notes":
+                return get_notes_tool(params.get("message", ""), user_id)
+            elif tool_name == "youtube" and function_name == "search_videos":
+                return search_youtube_tool(params.get("message", ""), user_id)
+            elif tool_name == "progress" and function_name == "get_progress":
+                return get_progress_tool(user_id)
+            return {"error": f"Unknown tool: {tool_name}_{function_name}"}
+        
+        except Exception as e:
+            return {"error": str(e)}
+    
+    @staticmethod
+    def _build_response_prompt(message: str, memory_context: Dict, tool_results: List[Dict]) -> str:
+        """Build enhanced response prompt with learning analytics"""
+        return f"""
 User message: {message}
 
 Context: {memory_context}
@@ -218,14 +271,18 @@ RESPONSE REQUIREMENTS:
 
 Make responses comprehensive, interactive, and educational!
 """
+    
+    async def _generate_response(self, message: str, user_id: int, memory_context: Dict, tool_results: List[Dict]) -> str:
+        """Generate response using OpenAI with comprehensive learning context"""
+        try:
+            response_prompt = self._build_response_prompt(message, memory_context, tool_results)
             
             chat_session = self.get_or_create_session(user_id)
-            chat_session.append({"role": "user", "content": response_prompt})
+            self._append_turn(chat_session, "user", response_prompt)
             
-            client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-            response = client.chat.completions.create(
+            response = await _client.chat.completions.create(
                 model=self.model,
-                messages=chat_session,
+                messages=[_SYSTEM_MESSAGE, *self._history_window(chat_session)],
                 max_tokens=1500,
                 temperature=0.7
             )
@@ -233,13 +290,102 @@ Make responses comprehensive, interactive, and educational!
             response_text = response.choices[0].message.content
             
             # Add assistant response to session
-            chat_session.append({"role": "assistant", "content": response_text})
+            self._append_turn(chat_session, "assistant", response_text)
             
             return self._format_response(response_text)
             
         except Exception as e:
             print(f"Response error: {e}")
-            return "I'm having trouble generating a response. Please try again."
+            return _GENERATION_FAILED
+    
+    async def _stream_generation(self, message: str, user_id: int, memory_context: Dict, tool_results: List[Dict]) -> AsyncIterator[str]:
+        """Like _generate_response, but yield content deltas as the model produces them
+        
+        The caller joins the deltas and records the assistant turn once the stream ends.
+        """
+        chat_session = self.get_or_create_session(user_id)
+        self._append_turn(chat_session, "user", self._build_response_prompt(message, memory_context, tool_results))
+        
+        streamed = False
+        try:
+            stream = await _client.chat.completions.create(
+                model=self.model,
+                messages=[_SYSTEM_MESSAGE, *self._history_window(chat_session)],
+                max_tokens=1500,
+                temperature=0.7,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    streamed = True
+                    yield delta
+        except Exception as e:
+            print(f"Response error: {e}")
+            if not streamed:
+                yield _GENERATION_FAILED
+    
+    @staticmethod
+    async def _encode_question(message: str) -> Optional[Any]:
+        """Normalized question embedding for the response cache, or None if encoding failed"""
+        try:
+            normalized = " ".join(message.lower().split())
+            return await asyncio.to_thread(memory_manager.encode_query, normalized)
+        except Exception as e:
+            print(f"Response cache error: {e}")
+            return None
+    
+    async def _prepare_turn(self, message: str, user_id: int, context: str, tool_calls: List[Dict]) -> Tuple[bytes, Optional[Any], Optional[str], str, List[Dict]]:
+        """Cache key, question embedding, any cached answer, enhanced context and tool results for this turn"""
+        # Memory recall is only needed on a miss, but starting it now overlaps it with the tools and encode
+        memory_recall = asyncio.ensure_future(self._get_memory_context(user_id, message))
+        query_embedding, tool_results = await asyncio.gather(
+            self._encode_question(message), self._execute_tools(tool_calls, user_id, context)
+        )
+        
+        # Tool-backed answers are keyed by the tool output they were built from, so a repeated
+        # "explain recursion" hits until the videos or notes it drew on change
+        cache_key = ResponseCache.context_key(context)
+        response_text = None
+        if query_embedding is not None:
+            try:
+                if tool_results:
+                    cache_key = ResponseCache.context_key(
+                        context, orjson.dumps(tool_results, default=str, option=orjson.OPT_SORT_KEYS)
+                    )
+                response_text = _response_cache.lookup(user_id, cache_key, query_embedding)
+            except Exception as e:
+                print(f"Response cache error: {e}")
+                query_embedding = None
+        
+        if response_text is not None:
+            memory_recall.cancel()
+            # Keep the chat session consistent with what the user saw
+            chat_session = self.get_or_create_session(user_id)
+            self._append_turn(chat_session, "user", message)
+            self._append_turn(chat_session, "assistant", response_text)
+            return cache_key, query_embedding, response_text, context, tool_results
+        
+        # Combine memory context with learning context from chatbot route
+        memory_context = await memory_recall
+        return cache_key, query_embedding, None, f"{context}\n\nMemoryContext: {memory_context}", tool_results
+    
+    def _remember_turn(self, user_id: int, message: str, response_text: str, tools_used: List[str]):
+        """Store conversation with learning context"""
+        try:
+            with memory_manager.batched_writes():
+                memory_manager.store_conversation(user_id, message, response_text, tools_used)
+                
+                # Store learning interaction if it involves help with failed concepts
+                if _LEARNING_HELP_RE.search(message):
+                    memory_manager.store_episodic(user_id, "learning_help", {
+                        "message": message,
+                        "response_length": len(response_text),
+                        "tools_used": tools_used
+                    })
+        
+        except Exception as e:
+            print(f"Memory storage error: {e}")
     
     async def get_response(self, message: str, user_id: int, context: str = "") -> Dict:
         """Main entry point with comprehensive learning context"""
@@ -248,49 +394,31 @@ Make responses comprehensive, interactive, and educational!
                 return {
                     "response": "AI assistant not configured.",
                     "timestamp": datetime.now().isoformat(),
-                    "message_id": str(uuid.uuid4())
+                    "message_id": token_hex(16)
                 }
             
-            # Get enhanced memory context with learning analytics
-            memory_context = await self._get_memory_context(user_id, message)
-            
-            # Combine memory context with learning context from chatbot route
-            enhanced_context = f"{context}\n\nMemoryContext: {memory_context}"
-            
-            # Parse intents and execute tools
+            # Parse intents first; tool results feed into the response cache key
             tool_calls = self._parse_intent(message)
-            tool_results = []
-            
-            if tool_calls:
-                tool_results = await self._execute_tools(tool_calls, user_id, enhanced_context)
-            
-            # Generate contextually aware response
-            response_text = await self._generate_response(message, user_id, enhanced_context, tool_results)
+            cache_key, query_embedding, response_text, enhanced_context, tool_results = await self._prepare_turn(
+                message, user_id, context, tool_calls
+            )
             
-            # Store conversation with learning context
-            try:
-                from app.core.agent_memory import memory_manager
-                memory_manager.store_conversation(
-                    user_id, message, response_text, 
-                    [tc.get("tool", "") for tc in tool_calls]
-                )
+            if response_text is None:
+                # Generate contextually aware response
+                response_text = await self._generate_response(message, user_id, enhanced_context, tool_results)
                 
-                # Store learning interaction if it involves help with failed concepts
-                if any(keyword in message.lower() for keyword in ['help', 'explain', 'understand', 'confused']):
-                    memory_manager.store_episodic(user_id, "learning_help", {
-                        "message": message,
-                        "response_length": len(response_text),
-                        "tools_used": [tc.get("tool", "") for tc in tool_calls]
-                    })
-                    
-            except Exception as e:
-                print(f"Memory storage error: {e}")
+                if query_embedding is not None and response_text != _GENERATION_FAILED:
+                    _response_cache.store(user_id, cache_key, query_embedding, response_text)
+            
+            tools_used = [tc.get("tool", "") for tc in tool_calls]
+            # Encoding and the SQLite commit are blocking, so keep them off the event loop
+            await asyncio.to_thread(self._remember_turn, user_id, message, response_text, tools_used)
             
             return {
                 "response": response_text,
                 "timestamp": datetime.now().isoformat(),
-                "message_id": str(uuid.uuid4()),
-                "tools_executed": [tc.get("tool", "") for tc in tool_calls],
+                "message_id": token_hex(16),
+                "tools_executed": tools_used,
                 "memory_updated": True,
                 "context_aware": True
             }
@@ -300,16 +428,57 @@ Make responses comprehensive, interactive, and educational!
             return {
                 "response": "I'm having trouble processing your request. Please try again.",
                 "timestamp": datetime.now().isoformat(),
-                "message_id": str(uuid.uuid4())
+                "message_id": token_hex(16)
             }
     
+    async def stream_response(self, message: str, user_id: int, context: str = "") -> AsyncIterator[str]:
+        """Streaming variant of get_response that yields the answer text as it is generated"""
+        if not settings.OPENAI_API_KEY:
+            yield "AI assistant not configured."
+            return
+        
+        try:
+            tool_calls = self._parse_intent(message)
+            cache_key, query_embedding, response_text, enhanced_context, tool_results = await self._prepare_turn(
+                message, user_id, context, tool_calls
+            )
+            
+            if response_text is not None:
+                yield response_text
+            else:
+                parts = []
+                async for delta in self._stream_generation(message, user_id, enhanced_context, tool_results):
+                    parts.append(delta)
+                    yield delta
+                response_text = self._format_response("".join(parts))
+                # Add the full assistant response to session once the stream ends
+                self._append_turn(self.get_or_create_session(user_id), "assistant", response_text)
+                
+                if query_embedding is not None and response_text and response_text != _GENERATION_FAILED:
+                    _response_cache.store(user_id, cache_key, query_embedding, response_text)
+            
+            await asyncio.to_thread(self._remember_turn, user_id, message, response_text, [tc.get("tool", "") for tc in tool_calls])
+        
+        except Exception as e:
+            print(f"Workflow error: {str(e)}")
+            yield "I'm having trouble processing your request. Please try again."
+    
+    async def warm_up(self):
+        """Open a pooled connection to the OpenAI API so the first chat skips the TLS handshake"""
+        if _client is None:
+            return
+        try:
+            await _client.models.retrieve(self.model)
+        except Exception as e:
+            print(f"OpenAI warm-up error: {e}")
+    
     def clear_session(self, user_id: int) -> bool:
         """Clear chat session for user"""
         session_key = f"user_{user_id}"
-        if session_key in self.chat_sessions:
-            del self.chat_sessions[session_key]
-            return True
-        return False
+        _response_cache.clear(user_id)
+        self._session_touched.pop(session_key, None)
+        # Single pop, no check-then-delete window
+        return self.chat_sessions.pop(session_key, None) is not None
 
 # Global agentic chatbot instance
 chatbot = AgenticOpenAIChatbot()
\ No newline at end of file
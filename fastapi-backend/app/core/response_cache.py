@@ -0,0 +1,73 @@
+"""
+Semantic Response Cache for EduAI Chatbot
+Reuses answers to near-duplicate questions instead of calling OpenAI again
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+class ResponseCache:
+    """Per-user cache of (question embedding, context key) -> response text.
+    
+    Answers are personalised by the learning context the route builds, so a
+    hit requires the same context fingerprint plus a cosine similarity above
+    the threshold on the L2-normalized question embedding.
+    """
+    
+    def __init__(self, threshold: float = 0.85, max_entries: int = 128, ttl: float = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: Dict[int, "OrderedDict[Tuple[bytes, bytes], Tuple[np.ndarray, float, str]]"] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def context_key(context: str, tool_results: bytes = b"") -> bytes:
+        """Fingerprint of the learning context and tool output the answer was generated from"""
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=16)
+        digest.update(tool_results)
+        return digest.digest()
+    
+    def lookup(self, user_id: int, context_key: bytes, embedding: np.ndarray) -> Optional[str]:
+        """Best cached response for a similar question under the same context, if any"""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(user_id)
+            if not entries:
+                return None
+            
+            best_key, best_score = None, self.threshold
+            for key, (cached_embedding, created, _) in list(entries.items()):
+                if now - created > self.ttl:
+                    del entries[key]
+                    continue
+                if key[1] != context_key:
+                    continue
+                score = float(np.dot(cached_embedding, embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            
+            if best_key is None:
+                return None
+            entries.move_to_end(best_key)
+            return entries[best_key][2]
+    
+    def store(self, user_id: int, context_key: bytes, embedding: np.ndarray, response_text: str):
+        """Remember a freshly generated response, evicting the least recently used"""
+        key = (embedding.tobytes(), context_key)
+        with self._lock:
+            entries = self._entries.setdefault(user_id, OrderedDict())
+            entries[key] = (embedding, time.monotonic(), response_text)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+    
+    def clear(self, user_id: int):
+        """Drop every cached response for a user"""
+        with self._lock:
+            self._entries.pop(user_id, None)
@@ -26,6 +26,8 @@ def create_access_token(data: dict):
 def decode_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
+        sub = payload.get("sub")
+        # Tokens carry the user ID as a string; parse it once here for every caller
+        return int(sub) if sub is not None else None
+    except (JWTError, ValueError, TypeError):
         return None
@@ -1,42 +1,77 @@
 import json
-import requests
 from typing import Optional, List, Dict, Any, Union
 import re
+from functools import lru_cache
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from app.core.google_auth import get_google_oauth2_session
 from app.models.user import User
 from app.database.db import get_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Search results keyed by (normalized query, max_results); they don't depend on the caller
+_search_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+_search_lock = Lock()
+# Playlists per user; dropped whenever this module changes them
+_playlists_cache: TTLCache = TTLCache(maxsize=1024, ttl=30)
+_playlists_lock = Lock()
+# Video summaries keyed by video_id (public metadata, same for every caller);
+# playlist summaries keyed by (user_id, playlist_id) since playlists can be private
+_video_summary_cache: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+_playlist_summary_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+_summary_lock = Lock()
+# Fans out the 50-id video detail batches of large playlists
+_details_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="yt-details")
 
 
 def _get_session_for_user(user_id: int):
     try:
-        print(f"Getting session for user {user_id}")
+        logger.debug("Getting session for user %s", user_id)
         db = next(get_db())
         user = db.query(User).filter(User.id == int(user_id)).first()
         
         if not user:
-            print(f"User {user_id} not found in database")
+            logger.error("User %s not found in database", user_id)
             raise ValueError("User not found")
         
         if not user.google_id:
-            print(f"User {user_id} does not have google_id")
+            logger.error("User %s does not have google_id", user_id)
             raise ValueError("Google account not linked for this user")
         
         if not user.google_access_token:
-            print(f"User {user_id} does not have google_access_token")
+            logger.error("User %s does not have google_access_token", user_id)
             raise ValueError("No access token available for this user")
         
-        print(f"User {user_id} has Google ID: {user.google_id}")
-        print(f"User {user_id} has access token: {user.google_access_token[:20]}..." if user.google_access_token else "No access token")
+        logger.debug("User %s has Google ID: %s", user_id, user.google_id)
             
         session = get_google_oauth2_session(user.google_id)
-        print(f"Successfully got session for user {user_id}")
+        logger.debug("Successfully got session for user %s", user_id)
         return session
     except Exception as e:
-        print(f"Error getting session for user {user_id}: {e}")
+        logger.error("Error getting session for user %s: %s", user_id, e)
         raise
 
 
 def search_youtube_videos(user_id: int, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    """
+    Search for YouTube videos, reusing recent results for the same query.
+    Returns a list of video metadata including id, title, description, thumbnail, and channel.
+    """
+    key = (query.strip().lower(), max_results)
+    with _search_lock:
+        videos = _search_cache.get(key)
+    if videos is None:
+        videos = _fetch_youtube_videos(user_id, query, max_results)
+        if videos:
+            with _search_lock:
+                _search_cache[key] = videos
+    return videos
+
+
+def _fetch_youtube_videos(user_id: int, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
     """
     Search for YouTube videos based on a query.
     Returns a list of video metadata including id, title, description, thumbnail, and channel.
@@ -77,16 +112,16 @@ def search_youtube_videos(user_id: int, query: str, max_results: int = 10) -> Li
             video_details = get_video_details(user_id, video_ids)
             
             # Merge duration information into video data
+            details_by_id = {detail['id']: detail for detail in video_details}
             for video in videos:
-                for detail in video_details:
-                    if video['id'] == detail['id']:
-                        video['duration'] = detail.get('duration', '')
-                        video['duration_seconds'] = detail.get('duration_seconds', 0)
-                        break
+                detail = details_by_id.get(video['id'])
+                if detail:
+                    video['duration'] = detail.get('duration', '')
+                    video['duration_seconds'] = detail.get('duration_seconds', 0)
         
         return videos
     except Exception as e:
-        print(f"YouTube search error: {e}")
+        logger.error("YouTube search error: %s", e)
         return []
 
 
@@ -133,7 +168,7 @@ def get_video_details(user_id: int, video_ids: List[str]) -> List[Dict[str, Any]
         
         return videos
     except Exception as e:
-        print(f"YouTube video details error: {e}")
+        logger.error("YouTube video details error: %s", e)
         return []
 
 
@@ -161,11 +196,29 @@ def parse_duration(duration_str: str) -> int:
 
 def get_user_playlists(user_id: int) -> List[Dict[str, Any]]:
     """
-    Get the user's YouTube playlists.
+    Get the user's YouTube playlists, reusing a list fetched in the last 30 seconds.
     Returns a list of playlist metadata including id, title, and thumbnail.
     """
+    user_id = int(user_id)
+    with _playlists_lock:
+        playlists = _playlists_cache.get(user_id)
+    if playlists is None:
+        playlists = _fetch_user_playlists(user_id)
+        if playlists:
+            with _playlists_lock:
+                _playlists_cache[user_id] = playlists
+    return playlists
+
+
+def invalidate_user_playlists(user_id: int):
+    """Forget a user's cached playlists after one is created or changed"""
+    with _playlists_lock:
+        _playlists_cache.pop(int(user_id), None)
+
+
+def _fetch_user_playlists(user_id: int) -> List[Dict[str, Any]]:
     try:
-        print(f"Getting playlists for user {user_id}")
+        logger.debug("Getting playlists for user %s", user_id)
         session = _get_session_for_user(user_id)
         
         # Call YouTube Data API playlists endpoint
@@ -178,15 +231,15 @@ def get_user_playlists(user_id: int) -> List[Dict[str, Any]]:
             }
         )
         
-        print(f"Playlists API Response Status: {response.status_code}")
+        logger.debug("Playlists API Response Status: %s", response.status_code)
         
         if response.status_code != 200:
-            print(f"Error getting playlists: {response.status_code}")
-            print(f"Response: {response.text}")
+            logger.error("Error getting playlists: %s", response.status_code)
+            logger.debug("Response: %s", response.text)
             return []
         
         response_data = response.json()
-        print(f"Found {len(response_data.get('items', []))} playlists")
+        logger.debug("Found %s playlists", len(response_data.get('items', [])))
         
         # Extract relevant information from playlists
         playlists = []
@@ -204,14 +257,12 @@ def get_user_playlists(user_id: int) -> List[Dict[str, Any]]:
                 'url': f'https://www.youtube.com/playlist?list={playlist_id}'
             }
             
-            print(f"Playlist: '{playlist_info['title']}' (ID: {playlist_id})")
+            logger.debug("Playlist: '%s' (ID: %s)", playlist_info['title'], playlist_id)
             playlists.append(playlist_info)
         
         return playlists
     except Exception as e:
-        print(f"YouTube playlists error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("YouTube playlists error: %s", e)
         return []
 
 
@@ -221,11 +272,11 @@ def create_playlist(user_id: int, title: str, description: str = "") -> Optional
     Returns the playlist metadata if successful.
     """
     try:
-        print(f"Starting playlist creation for user {user_id}, title: {title}")
+        logger.debug("Starting playlist creation for user %s, title: %s", user_id, title)
         
         # Get the session
         session = _get_session_for_user(user_id)
-        print(f"Got session for user {user_id}")
+        logger.debug("Got session for user %s", user_id)
         
         # Call YouTube Data API playlists endpoint to create a new playlist
         payload = {
@@ -238,7 +289,7 @@ def create_playlist(user_id: int, title: str, description: str = "") -> Optional
             }
         }
         
-        print(f"Making API request to create playlist '{title}'")
+        logger.debug("Making API request to create playlist '%s'", title)
         
         response = session.post(
             'https://www.googleapis.com/youtube/v3/playlists',
@@ -246,34 +297,34 @@ def create_playlist(user_id: int, title: str, description: str = "") -> Optional
             json=payload
         )
         
-        print(f"API Response Status: {response.status_code}")
+        logger.debug("API Response Status: %s", response.status_code)
         
         # Check for HTTP errors
         if response.status_code != 200:
-            print(f"HTTP Error: {response.status_code}")
-            print(f"Response Text: {response.text}")
+            logger.error("HTTP Error: %s", response.status_code)
+            logger.debug("Response Text: %s", response.text)
             
             if response.status_code == 401:
-                print("Authentication error: Token expired or invalid")
+                logger.error("Authentication error: Token expired or invalid")
                 return {"error": "Authentication failed. Please refresh your Google connection."}
             elif response.status_code == 403:
-                print("Permission error: YouTube API access denied")
+                logger.error("Permission error: YouTube API access denied")
                 return {"error": "YouTube permissions not granted. Please check your Google account settings."}
             elif response.status_code == 400:
-                print("Bad request error")
+                logger.error("Bad request error")
                 return {"error": "Invalid request format."}
             else:
                 return {"error": f"YouTube API error: {response.status_code}"}
         
         # Parse successful response
         response_data = response.json()
-        print(f"Success Response: {response_data}")
+        logger.debug("Success Response: %s", response_data)
         
         if 'id' in response_data:
             playlist_id = response_data.get('id')
             snippet = response_data.get('snippet', {})
             
-            print(f"✅ Successfully created playlist '{title}' with ID {playlist_id}")
+            logger.debug("✅ Successfully created playlist '%s' with ID %s", title, playlist_id)
             
             result = {
                 'id': playlist_id,
@@ -281,37 +332,36 @@ def create_playlist(user_id: int, title: str, description: str = "") -> Optional
                 'description': snippet.get('description', ''),
                 'url': f'https://www.youtube.com/playlist?list={playlist_id}'
             }
+            invalidate_user_playlists(user_id)
             return result
         else:
             error_message = response_data.get('error', {}).get('message', 'Unknown error')
-            print(f"❌ Failed to create playlist: {error_message}")
+            logger.error("❌ Failed to create playlist: %s", error_message)
             return {"error": f"YouTube API error: {error_message}"}
             
     except ValueError as ve:
-        print(f"ValueError in create_playlist: {ve}")
+        logger.error("ValueError in create_playlist: %s", ve)
         return {"error": str(ve)}
     except Exception as e:
-        print(f"Unexpected error in create_playlist: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error in create_playlist: %s", e)
         return {"error": f"Unexpected error: {str(e)}"}
 
 
+# Pattern for standard YouTube video URLs
+_VIDEO_ID_PATTERNS = [re.compile(p) for p in (
+    r'(?:youtube\.com/(?:watch\?v=|shorts/|embed/|v/)|youtu\.be/)([a-zA-Z0-9_-]{11})',
+    r'youtube\.com/watch\?.*v=([a-zA-Z0-9_-]{11})',
+)]
+
+@lru_cache(maxsize=2048)
 def extract_video_id_from_url(url: str) -> Optional[str]:
     """
     Extract video ID from various YouTube URL formats.
     Handles both simple video URLs and playlist URLs with additional parameters.
+    Results are memoized since the same "last video" URL is re-parsed across turns.
     """
-    import re
-    
-    # Pattern for standard YouTube video URLs
-    patterns = [
-        r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com/watch\?.*v=([a-zA-Z0-9_-]{11})',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
         if match:
             return match.group(1)
     
@@ -323,22 +373,22 @@ def add_video_to_playlist(user_id: int, playlist_id: str, video_id: str) -> Unio
     Returns True if successful, or a dict with 'error' key if failed.
     """
     try:
-        print(f"Starting video addition: user {user_id}, playlist {playlist_id}, video {video_id}")
+        logger.debug("Starting video addition: user %s, playlist %s, video %s", user_id, playlist_id, video_id)
         
         session = _get_session_for_user(user_id)
         if not session:
-            print(f"Could not get session for user {user_id}")
+            logger.error("Could not get session for user %s", user_id)
             return {"error": "Could not authenticate with YouTube. Please check your Google connection."}
-        print(f"Got session for user {user_id}")
+        logger.debug("Got session for user %s", user_id)
         
         # Clean video_id if it's a URL
         if video_id.startswith('http'):
             extracted_id = extract_video_id_from_url(video_id)
             if extracted_id:
                 video_id = extracted_id
-                print(f"Extracted video ID: {video_id}")
+                logger.debug("Extracted video ID: %s", video_id)
             else:
-                print(f"Could not extract video ID from URL: {video_id}")
+                logger.error("Could not extract video ID from URL: %s", video_id)
                 return {"error": f"Could not extract video ID from URL: {video_id}"}
         
         # Call YouTube Data API playlistItems endpoint to add a video
@@ -352,8 +402,8 @@ def add_video_to_playlist(user_id: int, playlist_id: str, video_id: str) -> Unio
             }
         }
         
-        print(f"Making API request to add video {video_id} to playlist {playlist_id}")
-        print(f"Payload: {payload}")
+        logger.debug("Making API request to add video %s to playlist %s", video_id, playlist_id)
+        logger.debug("Payload: %s", payload)
         
         response = session.post(
             'https://www.googleapis.com/youtube/v3/playlistItems',
@@ -361,25 +411,25 @@ def add_video_to_playlist(user_id: int, playlist_id: str, video_id: str) -> Unio
             json=payload
         )
         
-        print(f"API Response Status: {response.status_code}")
-        print(f"Response Headers: {dict(response.headers)}")
+        logger.debug("API Response Status: %s", response.status_code)
+        logger.debug("Response Headers: %s", response.headers)
         
         # Check for HTTP errors
         if response.status_code != 200:
-            print(f"HTTP Error: {response.status_code}")
-            print(f"Response Text: {response.text}")
+            logger.error("HTTP Error: %s", response.status_code)
+            logger.debug("Response Text: %s", response.text)
             
             if response.status_code == 401:
-                print("Authentication error: Token expired or invalid")
+                logger.error("Authentication error: Token expired or invalid")
                 return {"error": "Authentication failed. Please refresh your Google connection."}
             elif response.status_code == 403:
-                print("Permission error: YouTube API access denied")
+                logger.error("Permission error: YouTube API access denied")
                 return {"error": "YouTube permissions not granted. Please check your Google account settings."}
             elif response.status_code == 404:
-                print("Not found error: The playlist or video ID might be invalid")
+                logger.error("Not found error: The playlist or video ID might be invalid")
                 return {"error": "Playlist or video not found. Please check the playlist name and video URL."}
             elif response.status_code == 400:
-                print("Bad request error")
+                logger.error("Bad request error")
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', {}).get('message', 'Bad request')
@@ -387,26 +437,39 @@ def add_video_to_playlist(user_id: int, playlist_id: str, video_id: str) -> Unio
                 except:
                     return {"error": "Invalid request format."}
             else:
-                print(f"Other HTTP error: {response.status_code}")
+                logger.error("Other HTTP error: %s", response.status_code)
                 return {"error": f"YouTube API error: {response.status_code}"}
         
         # Success
         response_data = response.json()
-        print(f"✅ Successfully added video {video_id} to playlist {playlist_id}")
-        print(f"Response data: {response_data}")
+        logger.debug("✅ Successfully added video %s to playlist %s", video_id, playlist_id)
+        logger.debug("Response data: %s", response_data)
+        invalidate_user_playlists(user_id)
+        with _summary_lock:
+            _playlist_summary_cache.pop((int(user_id), playlist_id), None)
         return True
             
     except ValueError as ve:
-        print(f"ValueError in add_video_to_playlist: {ve}")
+        logger.error("ValueError in add_video_to_playlist: %s", ve)
         return {"error": f"Invalid data format: {str(ve)}"}
     except Exception as e:
-        print(f"Unexpected error in add_video_to_playlist: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error in add_video_to_playlist: %s", e)
         return {"error": f"Unexpected error: {str(e)}"}
 
 
 def get_video_summary(user_id: int, video_id: str) -> Optional[str]:
+    """Summary of a YouTube video, reusing a recent one for the same video"""
+    with _summary_lock:
+        summary = _video_summary_cache.get(video_id)
+    if summary is None:
+        summary = _build_video_summary(user_id, video_id)
+        if summary:
+            with _summary_lock:
+                _video_summary_cache[video_id] = summary
+    return summary
+
+
+def _build_video_summary(user_id: int, video_id: str) -> Optional[str]:
     """
     Get a summary of a YouTube video using the video transcript and AI.
     This would typically involve getting the transcript and then using an AI service to summarize it.
@@ -430,11 +493,24 @@ def get_video_summary(user_id: int, video_id: str) -> Optional[str]:
                f"This video by {video['channel']} has {video['views']} views. " + \
                f"A full summary would require transcript analysis with AI."
     except Exception as e:
-        print(f"YouTube video summary error: {e}")
+        logger.error("YouTube video summary error: %s", e)
         return None
 
 
 def get_playlist_summary(user_id: int, playlist_id: str) -> Optional[Dict[str, Any]]:
+    """Summary of a YouTube playlist, reusing a recent one for this user (treat as read-only)"""
+    key = (int(user_id), playlist_id)
+    with _summary_lock:
+        summary = _playlist_summary_cache.get(key)
+    if summary is None:
+        summary = _build_playlist_summary(user_id, playlist_id)
+        if summary:
+            with _summary_lock:
+                _playlist_summary_cache[key] = summary
+    return summary
+
+
+def _build_playlist_summary(user_id: int, playlist_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a summary of a YouTube playlist, including video count, total duration, and topics.
     """
@@ -493,10 +569,13 @@ def get_playlist_summary(user_id: int, playlist_id: str) -> Optional[Dict[str, A
         video_ids = [video['id'] for video in videos]
         video_details = []
         
-        # Process in batches of 50 (API limit)
-        for i in range(0, len(video_ids), 50):
-            batch_ids = video_ids[i:i+50]
-            batch_details = get_video_details(user_id, batch_ids)
+        # Process in batches of 50 (API limit), requested concurrently when there are several
+        batches = [video_ids[i:i+50] for i in range(0, len(video_ids), 50)]
+        if len(batches) > 1:
+            batch_results = _details_pool.map(lambda batch_ids: get_video_details(user_id, batch_ids), batches)
+        else:
+            batch_results = [get_video_details(user_id, batch_ids) for batch_ids in batches]
+        for batch_details in batch_results:
             video_details.extend(batch_details)
         
         # Calculate total duration
@@ -509,11 +588,11 @@ def get_playlist_summary(user_id: int, playlist_id: str) -> Optional[Dict[str, A
         total_duration = f"{hours}h {minutes}m {seconds}s"
         
         # Merge video details with playlist positions
+        details_by_id = {detail['id']: detail for detail in video_details}
         for video in videos:
-            for detail in video_details:
-                if video['id'] == detail['id']:
-                    video.update(detail)
-                    break
+            detail = details_by_id.get(video['id'])
+            if detail:
+                video.update(detail)
         
         # Sort by playlist position
         videos.sort(key=lambda x: x.get('position', 0))
@@ -528,5 +607,5 @@ def get_playlist_summary(user_id: int, playlist_id: str) -> Optional[Dict[str, A
             'url': f'https://www.youtube.com/playlist?list={playlist_id}'
         }
     except Exception as e:
-        print(f"YouTube playlist summary error: {e}")
+        logger.error("YouTube playlist summary error: %s", e)
         return None
\ No newline at end of file
@@ -11,7 +11,8 @@ engine = create_engine(
     pool_size=20,  # Increased from default 5
     max_overflow=20,  # Increased from default 10
     pool_timeout=60,  # Increased from default 30
-    pool_recycle=3600  # Recycle connections after 1 hour
+    pool_recycle=3600,  # Recycle connections after 1 hour
+    pool_pre_ping=True  # Replace connections the server dropped instead of failing the request
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,13 +1,25 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routes import auth, onboarding, youtube_schedule, chatbot
 from app.routes import learning_plan
 from app.routes import quiz
 
 from app.database.db import create_tables, engine, Base
+from app.core.config import settings
 from sqlalchemy import text
 
-app = FastAPI(title="EduAI Learning Platform", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="EduAI Learning Platform", version="1.0.0", default_response_class=ORJSONResponse)
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Log anything a route didn't handle and answer with a plain 500; HTTPExceptions keep their own status."""
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path)
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 # Configure CORS
 app.add_middleware(
@@ -29,7 +41,7 @@ app.include_router(quiz.router, tags=["Quiz"])
 
 @app.on_event("startup")
 async def startup_event():
-    """Force recreate all tables on startup to ensure a clean schema each run."""
+    """Create missing tables on startup; wipe the schema first only when RESET_DB_ON_STARTUP is set."""
     try:
         print("🔄 Initializing EduAI Agentic System...")
         
@@ -39,48 +51,57 @@ async def startup_event():
         
         # Initialize OpenAI chatbot
         from app.core.openai_ai import chatbot
+        await chatbot.warm_up()
         print("✅ OpenAI chatbot initialized")
         
-        print("🔄 Resetting database schema (public) with CASCADE...")
-        # Hard reset the schema to handle any tables not present in SQLAlchemy metadata
-        with engine.connect() as connection:
-            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
-            connection.execute(text("DROP SCHEMA IF EXISTS public CASCADE;"))
-            connection.execute(text("CREATE SCHEMA public;"))
-            # Optional grants for local dev environments
-            connection.execute(text("GRANT ALL ON SCHEMA public TO postgres;"))
-            connection.execute(text("GRANT ALL ON SCHEMA public TO public;"))
-        print("✅ Schema reset complete")
+        if settings.RESET_DB_ON_STARTUP:
+            print("🔄 Resetting database schema (public) with CASCADE...")
+            # Hard reset the schema to handle any tables not present in SQLAlchemy metadata
+            with engine.connect() as connection:
+                connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+                connection.execute(text("DROP SCHEMA IF EXISTS public CASCADE;"))
+                connection.execute(text("CREATE SCHEMA public;"))
+                # Optional grants for local dev environments
+                connection.execute(text("GRANT ALL ON SCHEMA public TO postgres;"))
+                connection.execute(text("GRANT ALL ON SCHEMA public TO public;"))
+            print("✅ Schema reset complete")
 
         # Create all tables with current models
         Base.metadata.create_all(bind=engine)
         print("✅ All tables created with current schema")
 
         # Verify the onboarding table has the updated columns
-        with engine.connect() as conn:
-            result = conn.execute(text(
-                """
-                SELECT column_name FROM information_schema.columns
-                WHERE table_name = 'onboarding'
-                ORDER BY ordinal_position
-                """
-            ))
-            columns = [row[0] for row in result.fetchall()]
-
-            required_columns = [
-                'id', 'user_id', 'name', 'grade', 'career_goals', 'current_skills', 'time_commitment'
-            ]
-
-            missing_columns = [col for col in required_columns if col not in columns]
-
-            if missing_columns:
-                print(f"❌ Onboarding table missing columns: {missing_columns}")
-            else:
-                print("✅ Onboarding table has all expected columns")
+        if settings.DEBUG:
+            with engine.connect() as conn:
+                result = conn.execute(text(
+                    """
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'onboarding'
+                    ORDER BY ordinal_position
+                    """
+                ))
+                columns = [row[0] for row in result.fetchall()]
+
+                required_columns = [
+                    'id', 'user_id', 'name', 'grade', 'career_goals', 'current_skills', 'time_commitment'
+                ]
+
+                missing_columns = [col for col in required_columns if col not in columns]
+
+                if missing_columns:
+                    print(f"❌ Onboarding table missing columns: {missing_columns}")
+                else:
+                    print("✅ Onboarding table has all expected columns")
 
     except Exception as e:
         print(f"❌ Error during database initialization: {e}")
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """Let queued agent memory writes finish before the worker exits."""
+    from app.core.agent_memory import memory_manager
+    memory_manager.drain_background()
+
 @app.get("/")
 def read_root():
     return {"message": "EduAI Learning Platform API"}
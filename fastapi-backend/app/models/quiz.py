@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 from app.database.db import Base
@@ -35,4 +35,11 @@ class QuizSubmission(Base):
     time_taken = Column(Integer, nullable=True)  # Time taken in seconds (optional)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Latest submission for a user's day without a sort
+        Index("ix_quiz_submissions_user_month_day_created", user_id, month_index, day, created_at.desc()),
+        # A user's most recent attempts (chat context) straight off the index
+        Index("ix_quiz_submissions_user_created", user_id, created_at.desc()),
+    )
+
 
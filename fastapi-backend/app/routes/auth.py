@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from app.schemas.user import UserCreate, UserLogin, UserOut, GoogleAuthRequest, GoogleUserInfo, PhoneVerificationRequest, PhoneVerificationCodeRequest
 from app.models.user import User
 from app.core.security import hash_password, verify_password, create_access_token, decode_token
-from app.core.google_auth import get_google_auth_url, exchange_code_for_tokens, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
+from app.core.google_auth import get_google_auth_url, exchange_code_for_tokens, invalidate_google_session, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
 from app.database.db import get_db
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse
@@ -47,7 +47,7 @@ def get_me(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), d
     user_id = decode_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -103,6 +103,7 @@ def google_auth_callback(data: GoogleAuthRequest, db: Session = Depends(get_db))
                 
             db.commit()
             db.refresh(existing_user)
+            invalidate_google_session(existing_user.google_id)
             user = existing_user
         else:
             # Create new user with Google info
@@ -151,7 +152,7 @@ def verify_google_auth(credentials: HTTPAuthorizationCredentials = Depends(beare
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -169,7 +170,7 @@ def connect_google_account(credentials: HTTPAuthorizationCredentials = Depends(b
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -190,7 +191,7 @@ def refresh_google_token(credentials: HTTPAuthorizationCredentials = Depends(bea
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -220,6 +221,7 @@ def refresh_google_token(credentials: HTTPAuthorizationCredentials = Depends(bea
         # Update the access token in the database
         user.google_access_token = token_data['access_token']
         db.commit()
+        invalidate_google_session(user.google_id)
         
         return {"status": "success", "message": "Google token refreshed successfully"}
     except Exception as e:
@@ -232,7 +234,7 @@ def send_phone_verification(request: PhoneVerificationRequest, credentials: HTTP
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -258,7 +260,7 @@ def verify_phone_code(request: PhoneVerificationCodeRequest, credentials: HTTPAu
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
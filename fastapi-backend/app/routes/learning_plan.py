@@ -26,7 +26,7 @@ def get_current_learning_position(credentials: HTTPAuthorizationCredentials = De
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -112,7 +112,7 @@ def generate_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(b
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -238,7 +238,7 @@ def generate_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(b
                             questions = []
                         if questions:
                             quiz = Quiz(
-                                user_id=int(user_id),
+                                user_id=user_id,
                                 plan_id=plan.id,
                                 month_index=1,
                                 day=1,
@@ -269,7 +269,7 @@ def generate_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(b
         try:
             from app.core.google_services import ensure_drive_folder
             root_name = f"EDUAI_{onboarding.name or 'USER'}_LEARNING_MAIN_PATH"
-            ensure_drive_folder(int(user_id), root_name)
+            ensure_drive_folder(user_id, root_name)
         except Exception as gerr:
             print(f"Drive root folder create error: {gerr}")
 
@@ -443,7 +443,7 @@ def start_month(plan_id: int, month_index: int, credentials: HTTPAuthorizationCr
     
     # Generate days if not already generated
     if not month.get("days") or len(month.get("days", [])) == 0:
-        onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+        onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
         if not onboarding:
             raise HTTPException(status_code=400, detail="Onboarding data required")
         
@@ -473,7 +473,7 @@ def start_month(plan_id: int, month_index: int, credentials: HTTPAuthorizationCr
         learning_path.total_days = 30
     
     # Update user's current position
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if user:
         user.current_plan_id = plan_id
         user.current_month_index = month_index
@@ -483,9 +483,9 @@ def start_month(plan_id: int, month_index: int, credentials: HTTPAuthorizationCr
     try:
         from app.core.google_services import ensure_drive_folder
         root_name = f"EDUAI_{(user.google_name or user.email or 'USER').split(' ')[0]}_LEARNING_MAIN_PATH" if user else "EDUAI_USER_LEARNING_MAIN_PATH"
-        root_id = ensure_drive_folder(int(user_id), root_name)
+        root_id = ensure_drive_folder(user_id, root_name)
         if root_id:
-            ensure_drive_folder(int(user_id), f"MONTH_{month_index}", parent_id=root_id)
+            ensure_drive_folder(user_id, f"MONTH_{month_index}", parent_id=root_id)
     except Exception as gerr:
         print(f"Drive month folder create error: {gerr}")
     
@@ -505,7 +505,7 @@ def get_month_days(plan_id: int, month_index: int, credentials: HTTPAuthorizatio
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
@@ -518,7 +518,7 @@ def get_month_days(plan_id: int, month_index: int, credentials: HTTPAuthorizatio
     
     # Always check if days are generated and fetch from database
     if not month.get("days_generated") or not days or len(days) == 0:
-        onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+        onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
         if not onboarding:
             raise HTTPException(status_code=400, detail="Onboarding data required")
         
@@ -639,7 +639,7 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found or unauthorized access")
 
@@ -659,7 +659,7 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
         try:
             from app.models.quiz import QuizSubmission
             passed_prev = db.query(QuizSubmission).filter(
-                QuizSubmission.user_id == int(user_id),
+                QuizSubmission.user_id == user_id,
                 QuizSubmission.plan_id == plan_id,
                 QuizSubmission.month_index == month_index,
                 QuizSubmission.day == day - 1,
@@ -684,7 +684,7 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
     # Generate day detail if not present
     if not days[day - 1].get("detail"):
         try:
-            onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+            onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
             if onboarding:
                 days[day - 1]["detail"] = _generate_day_detail_via_ai(month, days[day - 1], onboarding)
             else:
@@ -723,14 +723,14 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
             Quiz.plan_id == plan.id,
             Quiz.month_index == month_index,
             Quiz.day == day,
-            Quiz.user_id == int(user_id)
+            Quiz.user_id == user_id
         ).order_by(Quiz.id.desc()).first()
         if not days[day - 1].get("quiz_id") and not existing_quiz:
-            _onb = db.query(_Onb).filter(_Onb.user_id == int(user_id)).first()
+            _onb = db.query(_Onb).filter(_Onb.user_id == user_id).first()
             if _onb:
                 questions = _gen_quiz(month, days[day - 1], _onb, 10)
                 quiz = Quiz(
-                    user_id=int(user_id),
+                    user_id=user_id,
                     plan_id=plan.id,
                     month_index=month_index,
                     day=day,
@@ -761,16 +761,16 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
         learning_path.last_activity_at = datetime.utcnow()
     
     # Update user's current position
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if user:
         user.current_day = day
     
     # Google Drive: create a notes file for this day in month folder
     try:
-        from app.core.google_services import ensure_drive_folder, create_drive_file, create_calendar_event
+        from app.core.google_services import ensure_drive_folder, create_drive_file, create_calendar_event, invalidate_day_notes
         root_name = f"EDUAI_{(user.google_name or user.email or 'USER').split(' ')[0]}_LEARNING_MAIN_PATH" if user else "EDUAI_USER_LEARNING_MAIN_PATH"
-        root_id = ensure_drive_folder(int(user_id), root_name)
-        month_id = ensure_drive_folder(int(user_id), f"MONTH_{month_index}", parent_id=root_id) if root_id else None
+        root_id = ensure_drive_folder(user_id, root_name)
+        month_id = ensure_drive_folder(user_id, f"MONTH_{month_index}", parent_id=root_id) if root_id else None
         if month_id:
             day_detail = days[day - 1].get('detail') or {}
             overview = day_detail.get('overview', '')
@@ -788,11 +788,12 @@ def start_day(plan_id: int, month_index: int, day: int, credentials: HTTPAuthori
                 steps = s.get('steps') or []
                 for st in steps:
                     content_lines.append(f"  * {st}")
-            create_drive_file(int(user_id), f"DAY_{day}_NOTES.txt", "\n".join(content_lines), parent_id=month_id)
+            create_drive_file(user_id, f"DAY_{day}_NOTES.txt", "\n".join(content_lines), parent_id=month_id)
+            invalidate_day_notes(user_id, month_index, day)
         # Optional calendar entry for immediate next hour based on time_estimate
         try:
             minutes = int(days[day - 1].get('time_estimate', 60))
-            create_calendar_event(int(user_id), f"Study: Day {day}", datetime.utcnow(), duration_minutes=minutes, description=days[day - 1].get('concept',''))
+            create_calendar_event(user_id, f"Study: Day {day}", datetime.utcnow(), duration_minutes=minutes, description=days[day - 1].get('concept',''))
         except Exception:
             pass
     except Exception as gerr:
@@ -816,12 +817,12 @@ def complete_day(plan_id: int, month_index: int, day: int, score: int, credentia
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get user for updating current position
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get plan and verify it belongs to the user
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found or unauthorized access")
 
@@ -844,7 +845,7 @@ def complete_day(plan_id: int, month_index: int, day: int, score: int, credentia
         Quiz.plan_id == plan_id,
         Quiz.month_index == month_index,
         Quiz.day == day,
-        Quiz.user_id == int(user_id)
+        Quiz.user_id == user_id
     ).first()
     
     if not quiz:
@@ -861,7 +862,7 @@ def complete_day(plan_id: int, month_index: int, day: int, score: int, credentia
         if days[day - 1]["quiz_attempts"] >= 2:
             try:
                 # Get onboarding data for personalized day detail regeneration
-                onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+                onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
                 if onboarding:
                     # Regenerate day detail with more focus on areas user is struggling with
                     day_detail = _generate_day_detail_via_ai(month, days[day - 1], onboarding)
@@ -911,7 +912,7 @@ def complete_day(plan_id: int, month_index: int, day: int, score: int, credentia
             # We don't want to block the API response if email sending fails
             threading.Thread(
                 target=send_notification_email,
-                args=(int(user_id), "quiz_completion", email_context)
+                args=(user_id, "quiz_completion", email_context)
             ).start()
     except Exception as e:
         # Log error but don't fail the API call
@@ -954,7 +955,7 @@ def complete_day(plan_id: int, month_index: int, day: int, score: int, credentia
                 # Send the email notification asynchronously
                 threading.Thread(
                     target=send_notification_email,
-                    args=(int(user_id), "learning_progress", email_context)
+                    args=(user_id, "learning_progress", email_context)
                 ).start()
         except Exception as e:
             # Log error but don't fail the API call
@@ -1034,7 +1035,7 @@ def get_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(bearer
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    plan = db.query(LearningPlan).filter(LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Learning plan not found")
     
@@ -1045,7 +1046,7 @@ def get_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(bearer
     for i, m in enumerate(months):
         # Check if days are generated for active months
         if m.get("status") == "active" and (not m.get("days_generated") or not m.get("days") or len(m.get("days", [])) == 0):
-            onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+            onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
             if onboarding:
                 m["days"] = _generate_days_for_month_via_ai(m, onboarding)
                 m["days_generated"] = True
@@ -1058,7 +1059,7 @@ def get_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(bearer
             updated = True
         # If days_generated is True but days are empty, regenerate them
         elif m.get("days_generated") and (not m.get("days") or len(m.get("days", [])) == 0):
-            onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+            onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
             if onboarding:
                 m["days"] = _generate_days_for_month_via_ai(m, onboarding)
                 months[i] = m
@@ -1070,7 +1071,7 @@ def get_learning_plan(credentials: HTTPAuthorizationCredentials = Depends(bearer
         db.refresh(plan)
     
     # Get user's current position
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     current_position = {
         "current_plan_id": user.current_plan_id,
         "current_month_index": user.current_month_index,
@@ -1098,7 +1099,7 @@ def get_learning_plan_by_id(plan_id: int, credentials: HTTPAuthorizationCredenti
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Learning plan not found")
     months = plan.plan.get("months", []) if isinstance(plan.plan, dict) else []
@@ -1106,7 +1107,7 @@ def get_learning_plan_by_id(plan_id: int, credentials: HTTPAuthorizationCredenti
     for i, m in enumerate(months):
         # Check if days are generated for active months
         if m.get("status") == "active" and (not m.get("days_generated") or not m.get("days") or len(m.get("days", [])) == 0):
-            onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+            onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
             if onboarding:
                 m["days"] = _generate_days_for_month_via_ai(m, onboarding)
                 m["days_generated"] = True
@@ -1119,7 +1120,7 @@ def get_learning_plan_by_id(plan_id: int, credentials: HTTPAuthorizationCredenti
             updated = True
         # If days_generated is True but days are empty, regenerate them
         elif m.get("days_generated") and (not m.get("days") or len(m.get("days", [])) == 0):
-            onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+            onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
             if onboarding:
                 m["days"] = _generate_days_for_month_via_ai(m, onboarding)
                 months[i] = m
@@ -1130,7 +1131,7 @@ def get_learning_plan_by_id(plan_id: int, credentials: HTTPAuthorizationCredenti
         db.refresh(plan)
     
     # Get user's current position
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     current_position = {
         "current_plan_id": user.current_plan_id,
         "current_month_index": user.current_month_index,
@@ -19,7 +19,7 @@ def save_onboarding(data: OnboardingData, credentials: HTTPAuthorizationCredenti
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -58,7 +58,7 @@ def get_onboarding(credentials: HTTPAuthorizationCredentials = Depends(bearer_sc
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
             
-        onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+        onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
         
         if not onboarding:
             raise HTTPException(status_code=404, detail="Onboarding data not found")
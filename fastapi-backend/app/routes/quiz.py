@@ -9,6 +9,7 @@ from app.models.learning_plan import LearningPlan
 from app.models.onboarding import Onboarding
 from app.core.gemini_ai import chatbot
 from app.routes.learning_plan import _generate_days_for_month_via_ai
+from app.routes.chatbot import invalidate_chat_context
 from app.core.learning_path_service import LearningPathService
 
 router = APIRouter()
@@ -172,7 +173,7 @@ def generate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPAut
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
@@ -183,7 +184,7 @@ def generate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPAut
     
     # Ensure days are generated for this month
     if not month.get("days") or len(month.get("days", [])) == 0:
-        onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+        onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
         if not onboarding:
             raise HTTPException(status_code=400, detail="Onboarding data required")
         month["days"] = _generate_days_for_month_via_ai(month, onboarding)
@@ -198,7 +199,7 @@ def generate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPAut
         raise HTTPException(status_code=400, detail="Invalid day")
 
     # Get onboarding data for personalized quiz generation
-    onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+    onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
     if not onboarding:
         raise HTTPException(status_code=400, detail="Onboarding data required")
     
@@ -230,7 +231,7 @@ def generate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPAut
 
     # Create quiz record
     quiz = Quiz(
-        user_id=int(user_id),
+        user_id=user_id,
         plan_id=plan.id,
         month_index=month_index,
         day=day,
@@ -270,12 +271,12 @@ def get_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPAuthoriz
         Quiz.plan_id == plan_id, 
         Quiz.month_index == month_index, 
         Quiz.day == day, 
-        Quiz.user_id == int(user_id)
+        Quiz.user_id == user_id
     ).order_by(Quiz.id.desc()).first()
     
     if not quiz:
         # If quiz not found directly, check if there's a quiz_id in the learning plan
-        plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+        plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
         if not plan:
             raise HTTPException(status_code=404, detail="Plan not found")
             
@@ -318,7 +319,7 @@ def submit_quiz(plan_id: int, month_index: int, day: int, answers: List[int], cr
         Quiz.plan_id == plan_id, 
         Quiz.month_index == month_index, 
         Quiz.day == day, 
-        Quiz.user_id == int(user_id)
+        Quiz.user_id == user_id
     ).order_by(Quiz.id.desc()).first()
     
     if not quiz:
@@ -353,7 +354,7 @@ def submit_quiz(plan_id: int, month_index: int, day: int, answers: List[int], cr
 
     # Get attempt number for this quiz
     attempt_count = db.query(QuizSubmission).filter(
-        QuizSubmission.user_id == int(user_id),
+        QuizSubmission.user_id == user_id,
         QuizSubmission.plan_id == plan_id,
         QuizSubmission.month_index == month_index,
         QuizSubmission.day == day
@@ -361,7 +362,7 @@ def submit_quiz(plan_id: int, month_index: int, day: int, answers: List[int], cr
     
     # Record submission with detailed results for analysis
     record = QuizSubmission(
-        user_id=int(user_id),
+        user_id=user_id,
         plan_id=plan_id,
         month_index=month_index,
         day=day,
@@ -374,12 +375,14 @@ def submit_quiz(plan_id: int, month_index: int, day: int, answers: List[int], cr
     )
     db.add(record)
     db.commit()
+    # Recent quiz results feed the chat context
+    invalidate_chat_context(user_id)
 
     # If quiz is passed, use LearningPathService to complete the day and advance
     if passed:
         try:
             completion_result = LearningPathService.complete_day(
-                db, int(user_id), plan_id, month_index, day, score
+                db, user_id, plan_id, month_index, day, score
             )
             
             # Get concept for response
@@ -450,7 +453,7 @@ def regenerate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPA
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == int(user_id)).first()
+    plan = db.query(LearningPlan).filter(LearningPlan.id == plan_id, LearningPlan.user_id == user_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
@@ -463,13 +466,13 @@ def regenerate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPA
         raise HTTPException(status_code=400, detail="Invalid day")
 
     # Get onboarding data
-    onboarding = db.query(Onboarding).filter(Onboarding.user_id == int(user_id)).first()
+    onboarding = db.query(Onboarding).filter(Onboarding.user_id == user_id).first()
     if not onboarding:
         raise HTTPException(status_code=400, detail="Onboarding data required")
         
     # Get previous quiz attempts to analyze performance
     previous_submissions = db.query(QuizSubmission).filter(
-        QuizSubmission.user_id == int(user_id),
+        QuizSubmission.user_id == user_id,
         QuizSubmission.plan_id == plan_id,
         QuizSubmission.month_index == month_index,
         QuizSubmission.day == day
@@ -518,7 +521,7 @@ def regenerate_quiz(plan_id: int, month_index: int, day: int, credentials: HTTPA
 
     # Create new quiz record
     quiz = Quiz(
-        user_id=int(user_id),
+        user_id=user_id,
         plan_id=plan.id,
         month_index=month_index,
         day=day,
@@ -570,7 +573,7 @@ def get_available_quizzes(credentials: HTTPAuthorizationCredentials = Depends(be
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get all quizzes for the user
-    quizzes = db.query(Quiz).filter(Quiz.user_id == int(user_id)).order_by(Quiz.created_at.desc()).all()
+    quizzes = db.query(Quiz).filter(Quiz.user_id == user_id).order_by(Quiz.created_at.desc()).all()
     
     quiz_list = []
     for quiz in quizzes:
@@ -631,7 +634,7 @@ def get_quiz_status(plan_id: int, month_index: int, day: int, credentials: HTTPA
         Quiz.plan_id == plan_id, 
         Quiz.month_index == month_index, 
         Quiz.day == day, 
-        Quiz.user_id == int(user_id)
+        Quiz.user_id == user_id
     ).order_by(Quiz.id.desc()).first()
     
     if not quiz:
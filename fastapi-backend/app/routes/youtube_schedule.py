@@ -8,7 +8,6 @@ from app.core.security import decode_token
 from app.core.google_auth import get_google_oauth2_session
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List
-import requests
 from datetime import datetime, timedelta
 
 bearer_scheme = HTTPBearer()
@@ -21,7 +20,7 @@ def get_youtube_schedules(credentials: HTTPAuthorizationCredentials = Depends(be
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    schedules = db.query(YouTubeSchedule).filter(YouTubeSchedule.user_id == int(user_id)).all()
+    schedules = db.query(YouTubeSchedule).filter(YouTubeSchedule.user_id == user_id).all()
     return schedules
 
 @router.post("/youtube-schedules", response_model=YouTubeScheduleOut)
@@ -31,7 +30,7 @@ def add_youtube_schedule(data: YouTubeScheduleCreate, credentials: HTTPAuthoriza
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     schedule = YouTubeSchedule(
-        user_id=int(user_id),
+        user_id=user_id,
         playlist_id=data.playlist_id,
         playlist_url=data.playlist_url,
         playlist_title=data.playlist_title,
@@ -51,7 +50,7 @@ def delete_youtube_schedule(schedule_id: int, credentials: HTTPAuthorizationCred
     user_id = decode_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    schedule = db.query(YouTubeSchedule).filter(YouTubeSchedule.id == schedule_id, YouTubeSchedule.user_id == int(user_id)).first()
+    schedule = db.query(YouTubeSchedule).filter(YouTubeSchedule.id == schedule_id, YouTubeSchedule.user_id == user_id).first()
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
     db.delete(schedule)
@@ -65,10 +64,10 @@ def sync_schedule_to_google_calendar(schedule_id: int, credentials: HTTPAuthoriz
     user_id = decode_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    schedule = db.query(YouTubeSchedule).filter(YouTubeSchedule.id == schedule_id, YouTubeSchedule.user_id == int(user_id)).first()
+    schedule = db.query(YouTubeSchedule).filter(YouTubeSchedule.id == schedule_id, YouTubeSchedule.user_id == user_id).first()
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user.is_google_authenticated:
         raise HTTPException(status_code=400, detail="User must be authenticated with Google to sync to calendar")
     try:
@@ -192,10 +191,10 @@ def sync_all_schedules_to_google_calendar(credentials: HTTPAuthorizationCredenti
     user_id = decode_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = db.query(User).filter(User.id == user_id).first()
     if not user.is_google_authenticated:
         raise HTTPException(status_code=400, detail="User must be authenticated with Google to sync to calendar")
-    schedules = db.query(YouTubeSchedule).filter(YouTubeSchedule.user_id == int(user_id)).all()
+    schedules = db.query(YouTubeSchedule).filter(YouTubeSchedule.user_id == user_id).all()
     if not schedules:
         raise HTTPException(status_code=404, detail="No schedules found")
     try:
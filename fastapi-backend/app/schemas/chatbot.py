@@ -4,6 +4,7 @@ from typing import List, Optional
 class ChatMessage(BaseModel):
     message: str
     user_id: Optional[int] = None
+    stream: bool = False  # Reply as server-sent events instead of one JSON body
 
 class ChatResponse(BaseModel):
     response: str
@@ -13,3 +14,13 @@ class ChatResponse(BaseModel):
 class ChatHistory(BaseModel):
     messages: List[dict]
     user_id: int
+
+class NotesUpdate(BaseModel):
+    content: str
+
+class PlaylistCreate(BaseModel):
+    title: str
+    description: str = ""
+
+class PlaylistAddVideo(BaseModel):
+    video_id: str